@@ -0,0 +1,258 @@
+import numpy as np
+
+from lap_delta import LapDeltaIndex, ReferenceLaps
+from numpy_structs import packet_dtype
+
+from f1_2019_struct import *
+
+HEADER_DTYPE = packet_dtype(PacketHeader)
+CARS = np.arange(20)
+
+# Derived values published for every car, NaN (null in JSON) while unknown
+CAR_METRICS = np.dtype([
+    ('gap_to_leader', np.float64),  # Seconds behind the race leader
+    ('gap_to_car_ahead', np.float64),  # Seconds behind the car one position ahead
+    ('last_sector', np.float64),  # Last completed sector, 0-2
+    ('sector_time', np.float64),  # Time of the last completed sector in seconds
+    ('sector_delta', np.float64),  # sector_time minus the car's previous best time in that sector
+    ('fuel_per_lap', np.float64),  # Mean fuel burnt per completed lap
+    ('fuel_laps_left', np.float64),  # Laps the fuel in the tank lasts at fuel_per_lap
+    ('tyre_wear_per_lap', np.float64),  # Mean wear per lap of the most worn tyre in the current stint
+    ('tyre_laps_left', np.float64),  # Laps until the most worn tyre reaches the wear limit
+    ('ers_net_this_lap', np.float64),  # ERS energy harvested minus deployed this lap in Joules
+    ('ers_net_last_lap', np.float64),  # Same, for the last completed lap
+    ('pit_lap', np.float64),  # Estimated pit lap, when tyres or fuel run out before the end of the race
+    ('delta_to_best', np.float64),  # Seconds up (negative) or down on the car's best lap at its position
+    ('delta_to_reference', np.float64),  # Same, against the fastest known lap of the track
+])
+
+
+class SessionAnalytics:
+    """
+    Derived strategy metrics of one session, updated in place from every lap, telemetry and status
+    packet. Each update handles all 20 cars in one vectorized step over a NumPy view of the datagram
+    and only needs the running state kept here, never the history of the session.
+
+    Gaps are timed at distance markers every marker_spacing metres: the session time each car passed
+    each of the last markers markers is kept, and a car's gap is the time since the car it is compared
+    with passed the marker the car passed last.
+    """
+
+    def __init__(self, session_uid, marker_spacing=5.0, markers=4096, wear_limit=70.0, references=None):
+        self.session_uid = session_uid
+        self.deltas = LapDeltaIndex(references)
+        self.marker_spacing = marker_spacing
+        self.markers = markers
+        self.wear_limit = wear_limit
+        self.session_time = 0.0
+        self.frame = 0
+        self.total_laps = 0
+        self.cars = np.full(20, np.nan, dtype=CAR_METRICS)
+
+        # Timing markers
+        self.marker_times = np.full((20, markers), np.nan)
+        self.marker_ids = np.full((20, markers), -1, dtype=np.int64)
+        self.marker = np.full(20, -1, dtype=np.int64)  # Last marker passed per car
+        self.distance = np.zeros(20)
+        self.speed = np.zeros(20)  # Metres per second, from telemetry
+
+        # Lap and sector state of the previous lap packet
+        self.lap_num = np.zeros(20, dtype=np.int64)
+        self.sector = np.zeros(20, dtype=np.int64)
+        self.sector_times = np.zeros((20, 2))
+        self.best_sectors = np.full((20, 3), np.inf)
+
+        # Latest status and its values when the current lap, or tyre stint, started
+        self.fuel = np.full(20, np.nan)
+        self.wear = np.full(20, np.nan)
+        self.ers_net = np.full(20, np.nan)
+        self.ers_flow = np.zeros(20)  # Harvested plus deployed this lap, which only goes down when a lap starts
+        self.fuel_at_lap_start = np.full(20, np.nan)
+        self.wear_at_lap_start = np.full(20, np.nan)
+        self.fuel_burnt = np.zeros(20)
+        self.fuel_laps = np.zeros(20)
+        self.stint_wear = np.zeros(20)
+        self.stint_laps = np.zeros(20)
+
+    def update(self, packet_id, header, data):
+        """Merges one datagram; returns True when it completed the metrics of a frame."""
+        self.session_time = float(header['m_sessionTime'])
+        self.frame = int(header['m_frameIdentifier'])
+        if packet_id == 2:
+            self._lap(np.frombuffer(data, dtype=packet_dtype(PacketLapData), count=1)[0]['m_lapData'])
+            return True
+        if packet_id == 6:
+            cars = np.frombuffer(data, dtype=packet_dtype(PacketCarTelemetryData), count=1)[0]['m_carTelemetryData']
+            self.speed = cars['m_speed'] / 3.6
+        elif packet_id == 7:
+            self._status(np.frombuffer(data, dtype=packet_dtype(PacketCarStatusData), count=1)[0]['cars_status_data'])
+        elif packet_id == 1:
+            session = np.frombuffer(data, dtype=packet_dtype(PacketSessionData), count=1)[0]
+            self.total_laps = int(session['m_totalLaps'])
+            track_id = int(session['m_trackId'])
+            # -1 is an unknown track, which mustn't share reference laps with other unknown tracks
+            if track_id >= 0:
+                self.deltas.set_track(track_id)
+        return False
+
+    def _lap(self, laps):
+        cars = self.cars
+        active = laps['m_resultStatus'] >= 2
+        self.distance = distance = laps['m_totalDistance'].astype(np.float64)
+
+        # Stamp the markers passed since the last packet
+        marker = np.floor(distance / self.marker_spacing).astype(np.int64)
+        passed = active & (marker > self.marker) & (distance >= 0)
+        slot = marker % self.markers
+        self.marker_times[CARS[passed], slot[passed]] = self.session_time
+        self.marker_ids[CARS[passed], slot[passed]] = marker[passed]
+        self.marker = np.where(passed, marker, self.marker)
+
+        # Car index per race position, 0 being no car
+        position = laps['m_carPosition'].astype(np.int64)
+        ranked = active & (position > 0) & (position <= 20)
+        by_position = np.zeros(21, dtype=np.int64)
+        by_position[position[ranked]] = CARS[ranked]
+        leader = np.full(20, by_position[1])
+        ahead = by_position[np.clip(position - 1, 0, 20)]
+        cars['gap_to_leader'] = np.where(ranked & (position > 1), self._gap(leader), np.nan)
+        cars['gap_to_leader'][ranked & (position == 1)] = 0.0
+        cars['gap_to_car_ahead'] = np.where(ranked & (position > 1), self._gap(ahead), np.nan)
+
+        # Sector completed since the last packet; sector 3 is what is left of the lap.
+        # A sector number outside 0-2 completes nothing.
+        sector = laps['m_sector'].astype(np.int64)
+        lap_num = laps['m_currentLapNum'].astype(np.int64)
+        completed = active & (self.lap_num > 0) & (self.sector >= 0) & (self.sector <= 2)
+        completed &= (sector != self.sector) | (lap_num != self.lap_num)
+        sector_time = np.choose(np.clip(self.sector, 0, 2), [
+            laps['m_sector1Time'], laps['m_sector2Time'],
+            laps['m_lastLapTime'] - self.sector_times[:, 0] - self.sector_times[:, 1],
+        ])
+        completed &= sector_time > 0
+        if completed.any():
+            index = CARS[completed], self.sector[completed]
+            best = self.best_sectors[index]
+            cars['last_sector'][completed] = self.sector[completed]
+            cars['sector_time'][completed] = sector_time[completed]
+            cars['sector_delta'][completed] = np.where(np.isfinite(best), sector_time[completed] - best, np.nan)
+            self.best_sectors[index] = np.minimum(best, sector_time[completed])
+        self.sector_times[:, 0] = laps['m_sector1Time']
+        self.sector_times[:, 1] = laps['m_sector2Time']
+        self.sector = sector
+
+        new_lap = active & (lap_num > self.lap_num) & (self.lap_num > 0)
+        self.lap_num = lap_num
+        if new_lap.any():
+            self._lap_completed(new_lap)
+        cars['pit_lap'] = self._pit_lap()
+
+        self.deltas.update(laps)
+        cars['delta_to_best'] = self.deltas.delta_to_best()
+        cars['delta_to_reference'] = self.deltas.delta_to_reference()
+
+    def _gap(self, other):
+        """Seconds since the other car of every car passed the last marker that car passed."""
+        slot = self.marker % self.markers
+        known = (self.marker >= 0) & (self.marker_ids[other, slot] == self.marker)
+        gap = self.marker_times[CARS, slot] - self.marker_times[other, slot]
+        # Without a shared marker yet, estimate from the distance between the cars and the current speed
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimate = (self.distance[other] - self.distance) / self.speed
+        return np.where(known, gap, np.where(self.speed > 1, estimate, np.nan))
+
+    def _lap_completed(self, new_lap):
+        cars = self.cars
+        burnt = self.fuel_at_lap_start - self.fuel
+        counted = new_lap & (burnt > 0)
+        self.fuel_burnt[counted] += burnt[counted]
+        self.fuel_laps[counted] += 1
+
+        # Wear going down means new tyres, so a new stint
+        worn = self.wear - self.wear_at_lap_start
+        self.stint_wear[new_lap & (worn < 0)] = 0
+        self.stint_laps[new_lap & (worn < 0)] = 0
+        counted = new_lap & (worn >= 0)
+        self.stint_wear[counted] += worn[counted]
+        self.stint_laps[counted] += 1
+
+        self.fuel_at_lap_start[new_lap] = self.fuel[new_lap]
+        self.wear_at_lap_start[new_lap] = self.wear[new_lap]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cars['fuel_per_lap'] = np.where(self.fuel_laps > 0, self.fuel_burnt / self.fuel_laps, np.nan)
+            cars['tyre_wear_per_lap'] = np.where(self.stint_laps > 0, self.stint_wear / self.stint_laps, np.nan)
+
+    def _status(self, status):
+        cars = self.cars
+        self.fuel = status['m_fuelInTank'].astype(np.float64)
+        self.wear = status['m_tyresWear'].max(axis=1).astype(np.float64)
+        harvested = status['m_ersHarvestedThisLapMGUK'].astype(np.float64) + status['m_ersHarvestedThisLapMGUH']
+        deployed = status['m_ersDeployedThisLap'].astype(np.float64)
+        flow = harvested + deployed
+        reset = flow < self.ers_flow
+        cars['ers_net_last_lap'][reset] = self.ers_net[reset]
+        self.ers_flow = flow
+        self.ers_net = harvested - deployed
+        cars['ers_net_this_lap'] = self.ers_net
+
+        # Cars seen for the first time start counting from here
+        unknown = np.isnan(self.fuel_at_lap_start)
+        self.fuel_at_lap_start[unknown] = self.fuel[unknown]
+        self.wear_at_lap_start[unknown] = self.wear[unknown]
+
+        # No measurable use per lap (wear is a whole percentage) leaves the laps left unknown
+        fuel_per_lap, wear_per_lap = cars['fuel_per_lap'], cars['tyre_wear_per_lap']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cars['fuel_laps_left'] = np.where(fuel_per_lap > 0, self.fuel / fuel_per_lap, np.nan)
+            cars['tyre_laps_left'] = np.where(
+                wear_per_lap > 0, np.maximum(self.wear_limit - self.wear, 0) / wear_per_lap, np.nan)
+
+    def _pit_lap(self):
+        laps_left = np.fmin(self.cars['tyre_laps_left'], self.cars['fuel_laps_left'])
+        pit_lap = self.lap_num + np.floor(laps_left)
+        if self.total_laps:
+            pit_lap[pit_lap >= self.total_laps] = np.nan
+        return np.where(np.isfinite(pit_lap), pit_lap, np.nan)
+
+    def message(self):
+        """JSON-ready metrics of the latest frame, one list of 20 values per metric, None where unknown."""
+        finite = {name: np.isfinite(self.cars[name]).tolist() for name in CAR_METRICS.names}
+        return {
+            'm_sessionUID': self.session_uid,
+            'm_sessionTime': self.session_time,
+            'm_frameIdentifier': self.frame,
+            'cars': {
+                name: [value if known else None for value, known in zip(self.cars[name].tolist(), finite[name])]
+                for name in CAR_METRICS.names
+            },
+        }
+
+
+class AnalyticsEngine:
+    """
+    Keeps a SessionAnalytics per m_sessionUID, fed with raw datagrams, and calls every listener with
+    the SessionAnalytics whenever a lap data packet completed the metrics of a frame.
+    """
+
+    packet_ids = (1, 2, 6, 7)
+
+    def __init__(self, **options):
+        self.options = options  # Passed to every SessionAnalytics
+        # sessions on the same track share their reference laps
+        options.setdefault('references', ReferenceLaps())
+        self.sessions = {}
+        self.listeners = []
+
+    def publish(self, data, spec):
+        if spec.packet_id not in self.packet_ids:
+            return
+        packet_id = spec.packet_id
+        header = np.frombuffer(data, dtype=HEADER_DTYPE, count=1)[0]
+        session_uid = int(header['m_sessionUID'])
+        session = self.sessions.get(session_uid)
+        if session is None:
+            session = self.sessions[session_uid] = SessionAnalytics(session_uid, **self.options)
+        if session.update(packet_id, header, data):
+            for listener in self.listeners:
+                listener(session)
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import timeit
+
+import websockets
+
+from broadcast import BroadcastHub, TelemetryProtocol
+from compression import DictionaryCompressor
+from ctypes_json import CDataJSONEncoder
+from packet_registry import REGISTRY
+from packet_ring import PacketRing
+
+from f1_2019_struct import *
+
+
+def sample_datagram(packet_id):
+    """Datagram of the given packet type filled with random bytes, so every field has a non-trivial value."""
+    spec = REGISTRY.specs[(2019, packet_id)]
+    packet = spec.decode(os.urandom(spec.size))
+    packet.m_header.m_packetFormat = spec.packet_format
+    packet.m_header.m_packetId = packet_id
+    return bytes(packet)
+
+
+def ops_per_second(function, number):
+    return number / min(timeit.repeat(function, number=number, repeat=5))
+
+
+def bench_packet(packet_id, number=200):
+    """
+    Parse and serialization throughput and output size for one packet type. Parsing is measured from
+    a local socket, dispatch included: recv and PacketSpec.decode, against recv_into a PacketRing.
+    """
+    spec = REGISTRY.specs[(2019, packet_id)]
+    data = sample_datagram(packet_id)
+    packet = spec.decode(data)
+    ring = PacketRing()
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def parse_copy():
+        sender.send(data)
+        return REGISTRY.decode(receiver.recv(65536))
+
+    def parse_ring():
+        sender.send(data)
+        return ring.recv_into(receiver)
+
+    with sender, receiver:
+        result = {
+            'bytes_in': len(data),
+            'parse_copy_ops': ops_per_second(parse_copy, number * 10),
+            'parse_ring_ops': ops_per_second(parse_ring, number * 10),
+        }
+
+    message = spec.encode(packet)
+    result['bytes_out'] = len(message.encode())
+    result['bytes_compressed'] = len(DictionaryCompressor().compress(message))
+    try:
+        json.dumps(packet, cls=CDataJSONEncoder)
+    except TypeError:
+        pass  # character arrays, which only the registry encoder turns into text
+    else:
+        result['encode_recursive_ops'] = ops_per_second(lambda: json.dumps(packet, cls=CDataJSONEncoder), number)
+    result['encode_compiled_ops'] = ops_per_second(lambda: spec.encode(packet), number)
+    return result
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    samples = sorted(samples)
+    return {'p{}'.format(point): samples[min(len(samples) - 1, len(samples) * point // 100)] for point in points}
+
+
+async def bench_latency(encode, decode, packet_ids, count=200, timeout=1.0):
+    """
+    UDP-in to WebSocket-out latency in microseconds per packet type, measured over loopback
+    through a BroadcastHub with one local WebSocket client, one packet in flight at a time.
+    """
+    hub = BroadcastHub(encode, decode)
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(lambda: TelemetryProtocol(hub), local_addr=('127.0.0.1', 0))
+    address = transport.get_extra_info('sockname')
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    results = {}
+
+    async with websockets.serve(hub.handler, '127.0.0.1', 0) as server:
+        port = next(iter(server.sockets)).getsockname()[1]
+        async with websockets.connect('ws://127.0.0.1:{}/'.format(port)) as client:
+            while not hub.subscribers:
+                await asyncio.sleep(0.001)
+            for packet_id in packet_ids:
+                data = sample_datagram(packet_id)
+                samples = []
+                for _ in range(count):
+                    start = time.perf_counter()
+                    sock.sendto(data, address)
+                    await asyncio.wait_for(client.recv(), timeout)
+                    samples.append((time.perf_counter() - start) * 1e6)
+                results[packet_id] = percentiles(samples)
+
+    transport.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(number=200, end_to_end=True):
+    """Runs the whole suite and returns the results as a JSON-serializable dict."""
+    from main import packet_to_json
+
+    packets = {packet_id: bench_packet(packet_id, number) for packet_id in PACKET_TYPES}
+    if end_to_end:
+        latency = asyncio.run(bench_latency(packet_to_json, REGISTRY.decode, list(packets)))
+        for packet_id, result in latency.items():
+            packets[packet_id]['latency_us'] = result
+
+    return {
+        'revision': git_revision(),
+        'timestamp': time.time(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'packets': {PACKET_TYPES[packet_id].__name__: result for packet_id, result in packets.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decoding, encoding and end-to-end latency per packet type")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--number', type=int, default=200, help="encodes per timing run")
+    parser.add_argument('--no-end-to-end', action='store_true', help="skip the UDP to WebSocket latency test")
+    args = parser.parse_args()
+
+    results = run(args.number, not args.no_end_to_end)
+
+    for name, result in results['packets'].items():
+        line = "{:<24} parse {:9.0f}/s  ring {:9.0f}/s".format(name, result['parse_copy_ops'], result['parse_ring_ops'])
+        line += "  encode {:>9} -> {:7.0f}/s  {:6d} B ({:5d} B compressed)".format(
+            "{:7.0f}/s".format(result['encode_recursive_ops']) if 'encode_recursive_ops' in result else "n/a",
+            result['encode_compiled_ops'], result['bytes_out'], result['bytes_compressed'])
+        if 'latency_us' in result:
+            line += "  latency p50 {p50:6.0f} us  p99 {p99:6.0f} us".format(**result['latency_us'])
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import asyncio
+import time
+
+import websockets
+
+from packet_registry import REGISTRY
+
+BINARY_PROTOCOL = 'f1-2019-binary'  # WebSocket subprotocol for clients receiving raw packets
+COMPRESSED_PROTOCOL = 'f1-2019-json-zdict'  # Subprotocol for clients receiving deflated JSON, see compression
+
+
+def select_protocol(connection, subprotocols):
+    """Accepts clients offering BINARY_PROTOCOL or COMPRESSED_PROTOCOL as well as plain clients offering neither."""
+    for protocol in (BINARY_PROTOCOL, COMPRESSED_PROTOCOL):
+        if protocol in subprotocols:
+            return protocol
+    return None
+
+
+class Outbox:
+    """
+    Bounded per-client outbox with latest-value conflation.
+    Holds at most one pending message per key (packet type, or subscription stream); a newer message
+    for a key that is still waiting replaces it, so a slow client gets fewer, fresher updates.
+    When more than size keys are pending, the oldest one is dropped.
+    Putting never blocks, so a slow client can't hold up the UDP reader or other clients.
+    """
+
+    def __init__(self, size=16):
+        self.size = size
+        self.pending = {}  # Pending message per key, oldest first
+        self.stamps = {}  # perf_counter() time the pending message per key was received
+        self.stamp = None  # Receive time of the message last returned by get
+        self.waiter = None
+        self.closed = False
+        self.compressed = False  # Whether the client takes messages compressed
+        self.sent = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    def put(self, key, message, stamp=None):
+        pending = self.pending
+        if key in pending:
+            self.conflated += 1
+        elif len(pending) >= self.size:
+            oldest = next(iter(pending))
+            del pending[oldest]
+            del self.stamps[oldest]
+            self.dropped += 1
+        pending[key] = message
+        self.stamps[key] = stamp
+        self._wake()
+
+    def merge(self, key, values, stamp=None):
+        """Like put, but merges the dict values into a pending dict for key instead of replacing it."""
+        pending = self.pending.get(key)
+        if pending is None:
+            self.put(key, values, stamp)
+        else:
+            pending.update(values)
+            self.conflated += 1
+
+    async def get(self):
+        """Oldest pending message, or None once the outbox is closed."""
+        while not self.pending:
+            if self.closed:
+                return None
+            self.waiter = asyncio.get_running_loop().create_future()
+            await self.waiter
+        self.sent += 1
+        key = next(iter(self.pending))
+        self.stamp = self.stamps.pop(key)
+        return self.pending.pop(key)
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        waiter = self.waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'sent': self.sent,
+            'conflated': self.conflated,
+            'dropped': self.dropped,
+        }
+
+
+class TelemetryProtocol(asyncio.DatagramProtocol):
+    """
+    Asyncio UDP endpoint for the F1 2019 feed.
+    Every datagram is handed to the hub exactly once, no matter how many WebSocket clients are connected,
+    after every stage in stages, such as an analytics.AnalyticsEngine, that also consumes the raw feed.
+    Each datagram is dispatched here, once: hubs and stages get publish(data, spec) with its PacketSpec.
+    Datagrams the registry doesn't dispatch are counted there and dropped, so hubs and stages only
+    ever see complete packets of a known type. A stage that raises is counted in stage_errors, per
+    stage class, and costs neither the other stages nor the hub the packet.
+    """
+
+    def __init__(self, hub, metrics=None, stages=(), registry=REGISTRY):
+        self.hub = hub
+        self.metrics = metrics
+        self.stages = stages
+        self.registry = registry
+        self.stage_errors = metrics.stage_errors if metrics is not None else {}
+
+    def datagram_received(self, data, addr):
+        spec = self.registry.dispatch(data)
+        if spec is None:
+            return
+        if self.metrics is not None:
+            self.metrics.received(data, spec)
+        for stage in self.stages:
+            try:
+                stage.publish(data, spec)
+            except Exception:
+                name = type(stage).__name__
+                self.stage_errors[name] = self.stage_errors.get(name, 0) + 1
+        self.hub.publish(data, spec)
+
+
+class BroadcastHub:
+    """
+    Decodes and encodes each packet once and fans the resulting message out to all subscribers.
+    Each subscriber owns an Outbox conflated per packet type, so the per-client cost of a packet
+    is a dict store and, when the client keeps up, a send.
+
+    Clients negotiating the BINARY_PROTOCOL subprotocol receive the datagrams untouched as binary
+    frames instead, to be decoded by f1_2019_struct.js; they cost no serialization at all.
+
+    With a compressor, clients negotiating COMPRESSED_PROTOCOL first receive its dictionary and then every
+    message as a compressed binary frame. Each message is compressed once, whatever the number of clients.
+    """
+
+    def __init__(self, encode, decode=None, outbox_size=16, metrics=None, compressor=None):
+        self.encode = encode  # Callable turning a decoded packet into the message sent to clients
+        self.decode = decode  # Callable decoding a datagram given its PacketSpec; without it encode gets the datagram
+        self.outbox_size = outbox_size
+        self.metrics = metrics
+        self.compressor = compressor  # compression.DictionaryCompressor, or None to serve uncompressed JSON only
+        self.subscribers = {}  # Outbox per connected client
+        self.binary_subscribers = {}
+
+    def subscribe(self, websocket, binary=False):
+        outbox = Outbox(self.outbox_size)
+        if binary:
+            self.binary_subscribers[websocket] = outbox
+        else:
+            self.subscribers[websocket] = outbox
+        return outbox
+
+    def unsubscribe(self, websocket):
+        self.subscribers.pop(websocket, None)
+        self.binary_subscribers.pop(websocket, None)
+
+    def publish(self, data, spec):
+        key = spec.packet_id
+        for outbox in self.binary_subscribers.values():
+            outbox.put(key, data)
+        receivers = self.receivers(key)
+        if not receivers:
+            return
+
+        metrics = self.metrics
+        if metrics is None:
+            message = self.encode(data if self.decode is None else self.decode(data, spec))
+            stamp = None
+        else:
+            stamp = time.perf_counter()
+            if self.decode is not None:
+                data = self.decode(data, spec)
+                decoded = time.perf_counter()
+                metrics.observe('decode', decoded - stamp)
+            else:
+                decoded = stamp
+            message = self.encode(data)
+            metrics.observe('encode', time.perf_counter() - decoded)
+
+        self.deliver(receivers, key, message, stamp)
+
+    def deliver(self, outboxes, key, message, stamp=None):
+        """Puts message into outboxes, compressing it once for all the clients that take it compressed."""
+        compressed = None
+        for outbox in outboxes:
+            if not outbox.compressed:
+                outbox.put(key, message, stamp)
+                continue
+            if compressed is None:
+                start = time.perf_counter()
+                compressed = self.compressor.compress(message)
+                if self.metrics is not None:
+                    self.metrics.observe('compress', time.perf_counter() - start)
+            outbox.put(key, compressed, stamp)
+
+    def receivers(self, key):
+        """Outboxes of the JSON clients that get every packet with packet id key."""
+        return self.subscribers.values()
+
+    def broadcast(self, key, message):
+        """Queues message for every non-binary client, conflated under key, next to the packets."""
+        self.deliver(self.subscribers.values(), key, message)
+
+    def stats(self):
+        """Outbox statistics per connected client."""
+        return [
+            dict(outbox.stats(), client=str(websocket.remote_address), binary=binary)
+            for binary, subscribers in ((False, self.subscribers), (True, self.binary_subscribers))
+            for websocket, outbox in list(subscribers.items())
+        ]
+
+    async def handler(self, websocket, path=None):
+        outbox = self.subscribe(websocket, websocket.subprotocol == BINARY_PROTOCOL)
+        outbox.compressed = websocket.subprotocol == COMPRESSED_PROTOCOL and self.compressor is not None
+        # wake the handler up when the client goes away, instead of on the next packet
+        closed = asyncio.ensure_future(websocket.wait_closed())
+        closed.add_done_callback(lambda _: outbox.close())
+        try:
+            if outbox.compressed:
+                await websocket.send(self.compressor.dictionary)
+            await send_outbox(websocket, outbox, metrics=self.metrics)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.unsubscribe(websocket)
+            closed.cancel()
+
+
+async def send_outbox(websocket, outbox, encode=None, metrics=None):
+    """Sends messages from outbox until it is closed, encoding them first if encode is given."""
+    while True:
+        message = await outbox.get()
+        if message is None:
+            return
+        if metrics is None:
+            await websocket.send(message if encode is None else encode(message))
+            continue
+        start = time.perf_counter()
+        if encode is not None:
+            message = encode(message)
+            encoded = time.perf_counter()
+            metrics.observe('encode', encoded - start)
+            start = encoded
+        await websocket.send(message)
+        sent = time.perf_counter()
+        metrics.observe('send', sent - start)
+        if outbox.stamp is not None:
+            metrics.observe('latency', sent - outbox.stamp)
@@ -0,0 +1,169 @@
+import ctypes
+import mmap
+import os
+import struct
+
+from packet_registry import REGISTRY
+
+from f1_2019_struct import LapData, PacketHeader, PacketLapData
+
+MAGIC = b'F1CAP\x00\x01\x00'  # Capture file signature and format version
+RECORD_LENGTH = struct.Struct('<H')  # Every datagram in the capture file is prefixed with its length
+LAP_NUM_OFFSET = PacketLapData.m_lapData.offset + LapData.m_currentLapNum.offset
+LAP_DATA_CARS = PacketLapData.m_lapData.size // ctypes.sizeof(LapData)
+
+
+class CaptureIndexEntry(ctypes.LittleEndianStructure):
+    """
+    Fixed-size record of the sidecar index, one per captured datagram.
+    """
+    _pack_ = 1
+    _fields_ = [
+        ('m_sessionUID', ctypes.c_ulonglong),  # Unique identifier for the session
+        ('m_sessionTime', ctypes.c_float),  # Session timestamp
+        ('m_frameIdentifier', ctypes.c_uint),  # Identifier for the frame the data was retrieved on
+        ('m_packetId', ctypes.c_ubyte),  # Identifier for the packet type
+        ('m_lapNum', ctypes.c_ubyte),  # Current lap of the player's car when the packet was received
+        ('offset', ctypes.c_ulonglong),  # Offset of the datagram in the capture file
+        ('length', ctypes.c_ushort),  # Length of the datagram in bytes
+    ]
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+class CaptureWriter:
+    """
+    Appends raw datagrams to a capture file and their header fields to the sidecar index.
+    Both files are written through large buffers, so recording costs two buffered writes per packet.
+    Records from its own socket through record(), or as a stage of the live pipeline through publish().
+    """
+
+    def __init__(self, path, buffer_size=1 << 20):
+        self.file = open(path, 'ab', buffering=buffer_size)
+        self.index = open(index_path(path), 'ab', buffering=buffer_size)
+        self.offset = self.file.tell()
+        if self.offset == 0:
+            self.file.write(MAGIC)
+            self.offset = len(MAGIC)
+        self.entry = CaptureIndexEntry()
+        self.laps = {}  # Latest lap number of the player's car per session
+
+    def record(self, data):
+        """Appends data if the registry dispatches it; other datagrams are counted there and skipped."""
+        spec = REGISTRY.dispatch(data)
+        if spec is not None:
+            self.publish(data, spec)
+
+    def publish(self, data, spec):
+        """Appends a datagram the registry dispatched to spec."""
+        length = len(data)
+        header = PacketHeader.from_buffer_copy(data)
+        entry = self.entry
+
+        # m_playerCarIndex is 255 while spectating, when there is no player's car to follow
+        if spec.packet_type is PacketLapData and header.m_playerCarIndex < LAP_DATA_CARS:
+            lap_num = data[LAP_NUM_OFFSET + header.m_playerCarIndex * ctypes.sizeof(LapData)]
+            self.laps[header.m_sessionUID] = lap_num
+        else:
+            lap_num = self.laps.get(header.m_sessionUID, 0)
+
+        entry.m_sessionUID = header.m_sessionUID
+        entry.m_sessionTime = header.m_sessionTime
+        entry.m_frameIdentifier = header.m_frameIdentifier
+        entry.m_packetId = header.m_packetId
+        entry.m_lapNum = lap_num
+        entry.offset = self.offset + RECORD_LENGTH.size
+        entry.length = length
+
+        self.file.write(RECORD_LENGTH.pack(length))
+        self.file.write(data)
+        self.index.write(entry)
+        self.offset += RECORD_LENGTH.size + length
+
+    def flush(self):
+        self.file.flush()
+        self.index.flush()
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CaptureReader:
+    """
+    Memory-maps a capture file and its index, the index as a NumPy array, so queries are a vectorized
+    mask over the index and packets are mapped straight out of the file without scanning it. Neither
+    file is read into memory up front, whatever the length of the session.
+    """
+
+    def __init__(self, path):
+        from numpy_structs import packet_dtype
+        import numpy as np
+
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{} is not an F1 capture file".format(path))
+            # copy-on-write mapping, so ctypes structs can be mapped onto it with from_buffer
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        dtype = packet_dtype(CaptureIndexEntry)
+        # a recorder that was stopped may have left part of an entry at the end
+        count = os.path.getsize(index_path(path)) // dtype.itemsize
+        if count:
+            entries = np.memmap(index_path(path), dtype=dtype, mode='r', shape=(count,))
+        else:
+            entries = np.zeros(0, dtype=dtype)
+        # or been stopped between flushing the index and the data file
+        offset, length = entries['offset'], entries['length']
+        while count and int(offset[count - 1]) + int(length[count - 1]) > len(self.data):
+            count -= 1
+        self.entries = entries[:count]
+
+    def select(self, packet_id=None, session_uid=None, lap=None, frames=None, session_time=None):
+        """
+        Index entries matching every given criterion, in capture order.
+        frames and session_time are (start, stop) ranges, stop excluded.
+        """
+        entries = self.entries
+        mask = None
+        for field, value in (('m_packetId', packet_id), ('m_sessionUID', session_uid), ('m_lapNum', lap)):
+            if value is not None:
+                mask = _and(mask, entries[field] == value)
+        for field, bounds in (('m_frameIdentifier', frames), ('m_sessionTime', session_time)):
+            if bounds is not None:
+                start, stop = bounds
+                mask = _and(mask, (entries[field] >= start) & (entries[field] < stop))
+        return entries if mask is None else entries[mask]
+
+    def datagram(self, entry):
+        offset = int(entry['offset'])
+        return memoryview(self.data)[offset:offset + int(entry['length'])]
+
+    def packets(self, packet_type, entries):
+        """Maps packet_type onto the datagram of each entry the registry dispatches to it, without copying."""
+        view = memoryview(self.data)
+        for offset, length in zip(entries['offset'].tolist(), entries['length'].tolist()):
+            spec = REGISTRY.dispatch(view[offset:offset + length])
+            if spec is not None and spec.packet_type is packet_type:
+                yield packet_type.from_buffer(self.data, offset)
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _and(mask, condition):
+    return condition if mask is None else mask & condition
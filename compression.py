@@ -0,0 +1,112 @@
+import argparse
+import os
+import zlib
+
+from packet_registry import REGISTRY
+
+from f1_2019_struct import PACKET_TYPES
+
+DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'f1_2019.zdict')
+DICTIONARY_SIZE = 32768  # Deflate only looks back 32 KiB, a longer dictionary is never used
+# Packet ids in dictionary order: the most frequent ones last, nearest to the data being compressed
+TRAINING_ORDER = (4, 5, 3, 1, 7, 2, 6, 0)
+
+_default_dictionary = None
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """
+    Preset deflate dictionary from sample encodings, given as lists of encoded messages per packet id.
+    Every message repeats its header, key names and car record layout, so the dictionary is the start
+    of a sample of each packet type, which covers those, within the 32 KiB deflate can refer back to.
+    """
+    packet_ids = [packet_id for packet_id in TRAINING_ORDER if samples.get(packet_id)]
+    share = size // max(len(packet_ids), 1)
+    return b''.join(samples[packet_id][-1][:share] for packet_id in packet_ids)
+
+
+def encode_samples(packets):
+    """Encoded messages per packet id of the packets."""
+    samples = {}
+    for packet in packets:
+        samples.setdefault(packet.m_header.m_packetId, []).append(REGISTRY.encode(packet).encode())
+    return samples
+
+
+def synthetic_samples(duration=0.5):
+    from replay import synthetic_packets
+
+    return encode_samples(packet for _, packet in synthetic_packets(0, duration))
+
+
+def capture_samples(path, per_type=16):
+    from capture import CaptureReader
+
+    with CaptureReader(path) as reader:
+        packets = []
+        for packet_id in PACKET_TYPES:
+            for entry in reader.select(packet_id=packet_id)[-per_type:]:
+                packet = REGISTRY.decode(reader.datagram(entry))
+                if packet is not None:
+                    packets.append(packet)
+    return encode_samples(packets)
+
+
+def default_dictionary():
+    """The dictionary in DICTIONARY_PATH, as written by this script, or else one trained on synthetic traffic."""
+    global _default_dictionary
+    if _default_dictionary is None:
+        if os.path.exists(DICTIONARY_PATH):
+            with open(DICTIONARY_PATH, 'rb') as file:
+                _default_dictionary = file.read()
+        else:
+            _default_dictionary = train_dictionary(synthetic_samples())
+    return _default_dictionary
+
+
+class DictionaryCompressor:
+    """
+    Compresses messages to raw deflate streams with a preset dictionary. The dictionary is loaded into
+    a compressor once; every message starts from a copy of it, so messages are independent of each
+    other and one compressed message can go to any number of clients.
+
+    Clients inflate each frame on its own with the same dictionary, e.g. pako.inflateRaw(frame, {dictionary})
+    in a browser or decompress(frame, dictionary) here.
+    """
+
+    def __init__(self, dictionary=None, level=6):
+        self.dictionary = dictionary if dictionary is not None else default_dictionary()
+        self._primed = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=self.dictionary)
+
+    def compress(self, message):
+        if isinstance(message, str):
+            message = message.encode()
+        compressor = self._primed.copy()
+        return compressor.compress(message) + compressor.flush()
+
+
+def decompress(data, dictionary):
+    decompressor = zlib.decompressobj(-15, zdict=dictionary)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the preset dictionary for compressed broadcasts")
+    parser.add_argument('capture', nargs='?', help="capture file to train on, synthetic traffic if omitted")
+    parser.add_argument('--output', default=DICTIONARY_PATH, help="dictionary file to write")
+    args = parser.parse_args()
+
+    samples = capture_samples(args.capture) if args.capture else synthetic_samples()
+    dictionary = train_dictionary(samples)
+    with open(args.output, 'wb') as file:
+        file.write(dictionary)
+
+    compressor = DictionaryCompressor(dictionary)
+    for packet_id, messages in sorted(samples.items()):
+        size = sum(len(message) for message in messages)
+        compressed = sum(len(compressor.compress(message)) for message in messages)
+        print("{:<24} {:8d} B -> {:7d} B".format(PACKET_TYPES[packet_id].__name__, size, compressed))
+
+
+if __name__ == "__main__":
+    main()
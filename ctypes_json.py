@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from ctypes import Array, Structure, Union, _Pointer, _SimpleCData
+from ctypes import Array, Structure, Union, _Pointer, _SimpleCData, c_char, c_wchar
 from json import JSONEncoder
 
 __version__ = '1.0.0'
@@ -42,3 +42,73 @@ class CDataJSONEncoder(JSONEncoder):
             return result
 
         return JSONEncoder.default(self, obj)
+
+
+_encoders = {}
+
+
+def compile_encoder(cls):
+    """
+    Generates a flat function turning an instance of the Structure/Union cls into the same
+    JSON-ready objects CDataJSONEncoder produces. The field walk happens once per class here
+    instead of once per packet; the result is cached.
+    """
+    encoder = _encoders.get(cls)
+    if encoder is not None:
+        return encoder
+
+    namespace = {'_default': CDataJSONEncoder().default}
+    anonymous = getattr(cls, '_anonymous_', [])
+    items = []
+
+    for key, field_type, *_ in getattr(cls, '_fields_', []):
+        # private fields don't encode
+        if key.startswith('_'):
+            continue
+
+        access = 'obj.' + key if key.isidentifier() else 'getattr(obj, %r)' % key
+        value = _value_source(field_type, access, namespace, 0)
+
+        if key in anonymous:
+            items.append('**' + value)
+        else:
+            items.append('%r: %s' % (key, value))
+
+    source = 'def encode_%s(obj):\n    return {%s}\n' % (cls.__name__, ', '.join(items))
+    exec(source, namespace)
+    encoder = namespace['encode_' + cls.__name__]
+    _encoders[cls] = encoder
+    return encoder
+
+
+def _value_source(field_type, access, namespace, depth):
+    if issubclass(field_type, (Structure, Union)):
+        name = '_encode_%d' % len(namespace)
+        namespace[name] = compile_encoder(field_type)
+        return '%s(%s)' % (name, access)
+
+    if issubclass(field_type, Array):
+        if field_type._type_ in (c_char, c_wchar) and depth == 0:
+            # ctypes hands character array fields back as bytes/str already
+            return access
+        item = 'e%d' % depth
+        item_value = _value_source(field_type._type_, item, namespace, depth + 1)
+        if item_value == item:
+            return access + '[:]'
+        return '[%s for %s in %s]' % (item_value, item, access)
+
+    if _SimpleCData in field_type.__bases__:
+        # fundamental types are converted to Python objects on attribute access
+        return access
+
+    return '_default(%s)' % access
+
+
+class CompiledJSONEncoder(CDataJSONEncoder):
+    """Drop-in replacement for CDataJSONEncoder that encodes structures through compile_encoder."""
+
+    def default(self, obj):
+        if isinstance(obj, (Structure, Union)):
+            return compile_encoder(type(obj))(obj)
+
+        return CDataJSONEncoder.default(self, obj)
@@ -0,0 +1,334 @@
+// Generated by js_decoder.py from the _fields_ in f1_2019_struct.py, do not edit.
+// Decodes the binary WebSocket frames sent to clients connecting with the "f1-2019-binary" subprotocol:
+//
+//     let ws = new WebSocket("ws://127.0.0.1:5678/", ["f1-2019-binary"]);
+//     ws.binaryType = "arraybuffer";
+//     ws.onmessage = (event) => { let packet = F1_2019.decodePacket(event.data); };
+const F1_2019 = (function () {
+    const text = new TextDecoder();
+    const i8 = (v, o) => v.getInt8(o);
+    const u8 = (v, o) => v.getUint8(o);
+    const i16 = (v, o) => v.getInt16(o, true);
+    const u16 = (v, o) => v.getUint16(o, true);
+    const i32 = (v, o) => v.getInt32(o, true);
+    const u32 = (v, o) => v.getUint32(o, true);
+    const i64 = (v, o) => v.getBigInt64(o, true);
+    const u64 = (v, o) => v.getBigUint64(o, true);
+    const f32 = (v, o) => v.getFloat32(o, true);
+    const f64 = (v, o) => v.getFloat64(o, true);
+    const bool = (v, o) => v.getUint8(o) !== 0;
+
+    function array(v, o, length, size, decode) {
+        const result = new Array(length);
+        for (let i = 0; i < length; i++) {
+            result[i] = decode(v, o + i * size);
+        }
+        return result;
+    }
+
+    function string(v, o, length) {
+        const bytes = new Uint8Array(v.buffer, v.byteOffset + o, length);
+        const end = bytes.indexOf(0);
+        return text.decode(end < 0 ? bytes : bytes.subarray(0, end));
+    }
+
+    function decodePacketHeader(v, o) {
+        return {
+            m_packetFormat: u16(v, o + 0),
+            m_gameMajorVersion: u8(v, o + 2),
+            m_gameMinorVersion: u8(v, o + 3),
+            m_packetVersion: u8(v, o + 4),
+            m_packetId: u8(v, o + 5),
+            m_sessionUID: u64(v, o + 6),
+            m_sessionTime: f32(v, o + 14),
+            m_frameIdentifier: u32(v, o + 18),
+            m_playerCarIndex: u8(v, o + 22),
+        };
+    }
+
+    function decodeCarMotionData(v, o) {
+        return {
+            m_worldPositionX: f32(v, o + 0),
+            m_worldPositionY: f32(v, o + 4),
+            m_worldPositionZ: f32(v, o + 8),
+            m_worldVelocityX: f32(v, o + 12),
+            m_worldVelocityY: f32(v, o + 16),
+            m_worldVelocityZ: f32(v, o + 20),
+            m_worldForwardDirX: i16(v, o + 24),
+            m_worldForwardDirY: i16(v, o + 26),
+            m_worldForwardDirZ: i16(v, o + 28),
+            m_worldRightDirX: i16(v, o + 30),
+            m_worldRightDirY: i16(v, o + 32),
+            m_worldRightDirZ: i16(v, o + 34),
+            m_gForceLateral: f32(v, o + 36),
+            m_gForceLongitudinal: f32(v, o + 40),
+            m_gForceVertical: f32(v, o + 44),
+            m_yaw: f32(v, o + 48),
+            m_pitch: f32(v, o + 52),
+            m_roll: f32(v, o + 56),
+        };
+    }
+
+    function decodePacketMotionData(v, o) {
+        return {
+            m_header: decodePacketHeader(v, o + 0),
+            cars_motion_data: array(v, o + 23, 20, 60, decodeCarMotionData),
+            m_suspensionPosition: array(v, o + 1223, 4, 4, f32),
+            m_suspensionVelocity: array(v, o + 1239, 4, 4, f32),
+            m_suspensionAcceleration: array(v, o + 1255, 4, 4, f32),
+            m_wheelSpeed: array(v, o + 1271, 4, 4, f32),
+            m_wheelSlip: array(v, o + 1287, 4, 4, f32),
+            m_localVelocityX: f32(v, o + 1303),
+            m_localVelocityY: f32(v, o + 1307),
+            m_localVelocityZ: f32(v, o + 1311),
+            m_angularVelocityX: f32(v, o + 1315),
+            m_angularVelocityY: f32(v, o + 1319),
+            m_angularVelocityZ: f32(v, o + 1323),
+            m_angularAccelerationX: f32(v, o + 1327),
+            m_angularAccelerationY: f32(v, o + 1331),
+            m_angularAccelerationZ: f32(v, o + 1335),
+            m_frontWheelsAngle: f32(v, o + 1339),
+        };
+    }
+
+    function decodeMarshalZone(v, o) {
+        return {
+            m_zoneStart: f32(v, o + 0),
+            m_zoneFlag: i8(v, o + 4),
+        };
+    }
+
+    function decodePacketSessionData(v, o) {
+        return {
+            m_header: decodePacketHeader(v, o + 0),
+            m_weather: u8(v, o + 23),
+            m_trackTemperature: i8(v, o + 24),
+            m_airTemperature: i8(v, o + 25),
+            m_totalLaps: u8(v, o + 26),
+            m_trackLength: u16(v, o + 27),
+            m_sessionType: u8(v, o + 29),
+            m_trackId: i8(v, o + 30),
+            m_formula: u8(v, o + 31),
+            m_sessionTimeLeft: u16(v, o + 32),
+            m_sessionDuration: u16(v, o + 34),
+            m_pitSpeedLimit: u8(v, o + 36),
+            m_gamePaused: u8(v, o + 37),
+            m_isSpectating: u8(v, o + 38),
+            m_spectatorCarIndex: u8(v, o + 39),
+            m_sliProNativeSupport: u8(v, o + 40),
+            m_numMarshalZones: u8(v, o + 41),
+            m_marshalZones: array(v, o + 42, 21, 5, decodeMarshalZone),
+            m_safetyCarStatus: u8(v, o + 147),
+            m_networkGame: u8(v, o + 148),
+        };
+    }
+
+    function decodeLapData(v, o) {
+        return {
+            m_lastLapTime: f32(v, o + 0),
+            m_currentLapTime: f32(v, o + 4),
+            m_bestLapTime: f32(v, o + 8),
+            m_sector1Time: f32(v, o + 12),
+            m_sector2Time: f32(v, o + 16),
+            m_lapDistance: f32(v, o + 20),
+            m_totalDistance: f32(v, o + 24),
+            m_safetyCarDelta: f32(v, o + 28),
+            m_carPosition: u8(v, o + 32),
+            m_currentLapNum: u8(v, o + 33),
+            m_pitStatus: u8(v, o + 34),
+            m_sector: u8(v, o + 35),
+            m_currentLapInvalid: u8(v, o + 36),
+            m_penalties: u8(v, o + 37),
+            m_gridPosition: u8(v, o + 38),
+            m_driverStatus: u8(v, o + 39),
+            m_resultStatus: u8(v, o + 40),
+        };
+    }
+
+    function decodePacketLapData(v, o) {
+        return {
+            m_header: decodePacketHeader(v, o + 0),
+            m_lapData: array(v, o + 23, 20, 41, decodeLapData),
+        };
+    }
+
+    function decodeFastestLap(v, o) {
+        return {
+            vehicleIdx: u8(v, o + 0),
+            lapTime: f32(v, o + 1),
+        };
+    }
+
+    function decodeRetirement(v, o) {
+        return {
+            vehicleIdx: u8(v, o + 0),
+        };
+    }
+
+    function decodeTeamMateInPits(v, o) {
+        return {
+            vehicleIdx: u8(v, o + 0),
+        };
+    }
+
+    function decodeRaceWinner(v, o) {
+        return {
+            vehicleIdx: u8(v, o + 0),
+        };
+    }
+
+    function decodeEventDataDetails(v, o) {
+        return {
+            FTLP: decodeFastestLap(v, o + 0),
+            RTMT: decodeRetirement(v, o + 0),
+            TMPT: decodeTeamMateInPits(v, o + 0),
+            RCWN: decodeRaceWinner(v, o + 0),
+        };
+    }
+
+    function decodePacketEventData(v, o) {
+        return {
+            m_header: decodePacketHeader(v, o + 0),
+            m_eventStringCode: string(v, o + 23, 4),
+            m_eventDetails: decodeEventDataDetails(v, o + 27),
+        };
+    }
+
+    function decodeParticipantData(v, o) {
+        return {
+            m_aiControlled: u8(v, o + 0),
+            m_driverId: u8(v, o + 1),
+            m_teamId: u8(v, o + 2),
+            m_raceNumber: u8(v, o + 3),
+            m_nationality: u8(v, o + 4),
+            m_name: string(v, o + 5, 48),
+            m_yourTelemetry: u8(v, o + 53),
+        };
+    }
+
+    function decodePacketParticipantsData(v, o) {
+        return {
+            m_header: decodePacketHeader(v, o + 0),
+            m_numCars: u8(v, o + 23),
+            m_participants: array(v, o + 24, 20, 54, decodeParticipantData),
+        };
+    }
+
+    function decodeCarSetupData(v, o) {
+        return {
+            m_frontWing: u8(v, o + 0),
+            m_rearWing: u8(v, o + 1),
+            m_onThrottle: u8(v, o + 2),
+            m_offThrottle: u8(v, o + 3),
+            m_frontCamber: f32(v, o + 4),
+            m_rearCamber: f32(v, o + 8),
+            m_frontToe: f32(v, o + 12),
+            m_rearToe: f32(v, o + 16),
+            m_frontSuspension: u8(v, o + 20),
+            m_rearSuspension: u8(v, o + 21),
+            m_frontAntiRollBar: u8(v, o + 22),
+            m_rearAntiRollBar: u8(v, o + 23),
+            m_frontSuspensionHeight: u8(v, o + 24),
+            m_rearSuspensionHeight: u8(v, o + 25),
+            m_brakePressure: u8(v, o + 26),
+            m_brakeBias: u8(v, o + 27),
+            m_frontTyrePressure: f32(v, o + 28),
+            m_rearTyrePressure: f32(v, o + 32),
+            m_ballast: u8(v, o + 36),
+            m_fuelLoad: f32(v, o + 37),
+        };
+    }
+
+    function decodePacketCarSetupData(v, o) {
+        return {
+            m_header: decodePacketHeader(v, o + 0),
+            cars_setup_data: array(v, o + 23, 20, 41, decodeCarSetupData),
+        };
+    }
+
+    function decodeCarTelemetryData(v, o) {
+        return {
+            m_speed: u16(v, o + 0),
+            m_throttle: f32(v, o + 2),
+            m_steer: f32(v, o + 6),
+            m_brake: f32(v, o + 10),
+            m_clutch: u8(v, o + 14),
+            m_gear: i8(v, o + 15),
+            m_engineRPM: u16(v, o + 16),
+            m_drs: u8(v, o + 18),
+            m_revLightsPercent: u8(v, o + 19),
+            m_brakesTemperature: array(v, o + 20, 4, 2, u16),
+            m_tyresSurfaceTemperature: array(v, o + 28, 4, 2, u16),
+            m_tyresInnerTemperature: array(v, o + 36, 4, 2, u16),
+            m_engineTemperature: u16(v, o + 44),
+            m_tyresPressure: array(v, o + 46, 4, 4, f32),
+            m_surfaceType: array(v, o + 62, 4, 1, u8),
+        };
+    }
+
+    function decodePacketCarTelemetryData(v, o) {
+        return {
+            m_header: decodePacketHeader(v, o + 0),
+            m_carTelemetryData: array(v, o + 23, 20, 66, decodeCarTelemetryData),
+            m_buttonStatus: u32(v, o + 1343),
+        };
+    }
+
+    function decodeCarStatusData(v, o) {
+        return {
+            m_tractionControl: u8(v, o + 0),
+            m_antiLockBrakes: u8(v, o + 1),
+            m_fuelMix: u8(v, o + 2),
+            m_frontBrakeBias: u8(v, o + 3),
+            m_pitLimiterStatus: u8(v, o + 4),
+            m_fuelInTank: f32(v, o + 5),
+            m_fuelCapacity: f32(v, o + 9),
+            m_fuelRemainingLaps: f32(v, o + 13),
+            m_maxRPM: u16(v, o + 17),
+            m_idleRPM: u16(v, o + 19),
+            m_maxGears: u8(v, o + 21),
+            m_drsAllowed: i8(v, o + 22),
+            m_tyresWear: array(v, o + 23, 4, 1, u8),
+            m_actualTyreCompound: u8(v, o + 27),
+            m_tyreVisualCompound: u8(v, o + 28),
+            m_tyresDamage: array(v, o + 29, 4, 1, u8),
+            m_frontLeftWingDamage: u8(v, o + 33),
+            m_frontRightWingDamage: u8(v, o + 34),
+            m_rearWingDamage: u8(v, o + 35),
+            m_engineDamage: u8(v, o + 36),
+            m_gearBoxDamage: u8(v, o + 37),
+            m_vehicleFiaFlags: i8(v, o + 38),
+            m_ersStoreEnergy: f32(v, o + 39),
+            m_ersDeployMode: u8(v, o + 43),
+            m_ersHarvestedThisLapMGUK: f32(v, o + 44),
+            m_ersHarvestedThisLapMGUH: f32(v, o + 48),
+            m_ersDeployedThisLap: f32(v, o + 52),
+        };
+    }
+
+    function decodePacketCarStatusData(v, o) {
+        return {
+            m_header: decodePacketHeader(v, o + 0),
+            cars_status_data: array(v, o + 23, 20, 56, decodeCarStatusData),
+        };
+    }
+
+    const decoders = {
+        0: decodePacketMotionData,
+        1: decodePacketSessionData,
+        2: decodePacketLapData,
+        3: decodePacketEventData,
+        4: decodePacketParticipantsData,
+        5: decodePacketCarSetupData,
+        6: decodePacketCarTelemetryData,
+        7: decodePacketCarStatusData,
+    };
+
+    function decodePacket(buffer) {
+        const v = new DataView(buffer);
+        const decode = decoders[v.getUint8(5)];
+        return decode === undefined ? null : decode(v, 0);
+    }
+
+    return {decodePacket: decodePacket, decoders: decoders};
+})();
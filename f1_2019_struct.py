@@ -37,12 +37,12 @@ class CarMotionData(ctypes.LittleEndianStructure):
         ('m_worldVelocityX', ctypes.c_float),  # Velocity in world space X
         ('m_worldVelocityY', ctypes.c_float),  # Velocity in world space Y
         ('m_worldVelocityZ', ctypes.c_float),  # Velocity in world space Z
-        ('m_worldForwardDirX', ctypes.c_ushort),  # World space forward X direction (normalised)
-        ('m_worldForwardDirY', ctypes.c_ushort),  # World space forward Y direction (normalised)
-        ('m_worldForwardDirZ', ctypes.c_ushort),  # World space forward Z direction (normalised)
-        ('m_worldRightDirX', ctypes.c_ushort),  # World space right X direction (normalised)
-        ('m_worldRightDirY', ctypes.c_ushort),  # World space right Y direction (normalised)
-        ('m_worldRightDirZ', ctypes.c_ushort),  # World space right Z direction (normalised)
+        ('m_worldForwardDirX', ctypes.c_short),  # World space forward X direction (normalised)
+        ('m_worldForwardDirY', ctypes.c_short),  # World space forward Y direction (normalised)
+        ('m_worldForwardDirZ', ctypes.c_short),  # World space forward Z direction (normalised)
+        ('m_worldRightDirX', ctypes.c_short),  # World space right X direction (normalised)
+        ('m_worldRightDirY', ctypes.c_short),  # World space right Y direction (normalised)
+        ('m_worldRightDirZ', ctypes.c_short),  # World space right Z direction (normalised)
         ('m_gForceLateral', ctypes.c_float),  # Lateral G-Force component
         ('m_gForceLongitudinal', ctypes.c_float),  # Longitudinal G-Force component
         ('m_gForceVertical', ctypes.c_float),  # Vertical G-Force component
@@ -208,7 +208,7 @@ class PacketEventData(ctypes.LittleEndianStructure):
         Race Winner         “RCWN”  The race winner is announced
     """
     _pack_ = 1
-    _fields = [
+    _fields_ = [
         ("m_header", PacketHeader),  # Header
         ("m_eventStringCode", ctypes.c_char * 4),  # Event string code, see below
         ("m_eventDetails", EventDataDetails),  # Event details - should be interpreted differently for each type
@@ -248,7 +248,7 @@ class CarSetupData(ctypes.LittleEndianStructure):
         ('m_frontCamber', ctypes.c_float),  # Front camber angle (suspension geometry)
         ('m_rearCamber', ctypes.c_float),  # Rear camber angle (suspension geometry)
         ('m_frontToe', ctypes.c_float),  # Front toe angle (suspension geometry)
-        ('m_rearToe', ctypes.c_ubyte),  # Rear toe angle (suspension geometry)
+        ('m_rearToe', ctypes.c_float),  # Rear toe angle (suspension geometry)
         ('m_frontSuspension', ctypes.c_ubyte),  # Front suspension
         ('m_rearSuspension', ctypes.c_ubyte),  # Rear suspension
         ('m_frontAntiRollBar', ctypes.c_ubyte),  # Front anti-roll bar
@@ -268,7 +268,6 @@ class PacketCarSetupData(ctypes.LittleEndianStructure):
     _pack_ = 1
     _fields_ = [
         ('m_header', PacketHeader),  # Header
-        ('m_numCars', ctypes.c_ubyte),
         ('cars_setup_data', CarSetupData * 20),
     ]
 
@@ -277,9 +276,9 @@ class CarTelemetryData(ctypes.LittleEndianStructure):
     _pack_ = 1
     _fields_ = [
         ('m_speed', ctypes.c_ushort),  # Speed of car in kilometres per hour
-        ('m_throttle', ctypes.c_ubyte),  # Amount of throttle applied (0 to 100)
-        ('m_steer', ctypes.c_byte),  # Steering (-100 (full lock left) to 100 (full lock right))
-        ('m_brake', ctypes.c_ubyte),  # Amount of brake applied (0 to 100)
+        ('m_throttle', ctypes.c_float),  # Amount of throttle applied (0.0 to 1.0)
+        ('m_steer', ctypes.c_float),  # Steering (-1.0 (full lock left) to 1.0 (full lock right))
+        ('m_brake', ctypes.c_float),  # Amount of brake applied (0.0 to 1.0)
         ('m_clutch', ctypes.c_ubyte),  # Amount of clutch applied (0 to 100)
         ('m_gear', ctypes.c_byte),  # Gear selected (1-8, N=0, R=-1)
         ('m_engineRPM', ctypes.c_ushort),  # Engine RPM
@@ -314,10 +313,11 @@ class CarStatusData(ctypes.LittleEndianStructure):
         ('m_pitLimiterStatus', ctypes.c_ubyte),  # Pit limiter status - 0 = off, 1 = on
         ('m_fuelInTank', ctypes.c_float),  # Current fuel mass
         ('m_fuelCapacity', ctypes.c_float),  # Fuel capacity
+        ('m_fuelRemainingLaps', ctypes.c_float),  # Fuel remaining in terms of laps (value on MFD)
         ('m_maxRPM', ctypes.c_ushort),  # Cars max RPM, point of rev limiter
         ('m_idleRPM', ctypes.c_ushort),  # Cars idle RPM
         ('m_maxGears', ctypes.c_ubyte),  # Maximum number of gears
-        ('m_drsAllowed', ctypes.c_ubyte),  # 0 = not allowed, 1 = allowed, -1 = unknown
+        ('m_drsAllowed', ctypes.c_byte),  # 0 = not allowed, 1 = allowed, -1 = unknown
         ('m_tyresWear', ctypes.c_ubyte * 4),  # Tyre wear percentage
         ('m_actualTyreCompound', ctypes.c_ubyte),
         # F1 Modern - 16 = C5, 17 = C4, 18 = C3, 19 = C2, 20 = C1, 7 = inter, 8 = wet
@@ -333,7 +333,6 @@ class CarStatusData(ctypes.LittleEndianStructure):
         ('m_rearWingDamage', ctypes.c_ubyte),  # Rear wing damage (percentage)
         ('m_engineDamage', ctypes.c_ubyte),  # Engine damage (percentage)
         ('m_gearBoxDamage', ctypes.c_ubyte),  # Gear box damage (percentage)
-        ('m_exhaustDamage', ctypes.c_ubyte),  # Exhaust damage (percentage)
         ('m_vehicleFiaFlags', ctypes.c_byte),  # -1 = invalid/unknown, 0 = none, 1 = green, 2 = blue
         #  3 = yellow, 4 = red
         ('m_ersStoreEnergy', ctypes.c_float),  # ERS energy store in Joules
@@ -348,5 +347,19 @@ class CarStatusData(ctypes.LittleEndianStructure):
 class PacketCarStatusData(ctypes.LittleEndianStructure):
     _pack_ = 1
     _fields_ = [
+        ('m_header', PacketHeader),  # Header
         ('cars_status_data', CarStatusData * 20)
     ]
+
+
+# Packet struct for each PacketHeader.m_packetId
+PACKET_TYPES = {
+    0: PacketMotionData,
+    1: PacketSessionData,
+    2: PacketLapData,
+    3: PacketEventData,
+    4: PacketParticipantsData,
+    5: PacketCarSetupData,
+    6: PacketCarTelemetryData,
+    7: PacketCarStatusData,
+}
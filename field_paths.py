@@ -0,0 +1,142 @@
+import ctypes
+import re
+import struct
+
+# struct format character per ctypes type code kind and size
+_INTEGERS = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+_FLOATS = {4: 'f', 8: 'd'}
+_SIGNED = set('bhilq')
+_UNSIGNED = set('BHILQ')
+
+_STEP = re.compile(r'\.(\w+)|\[(\d+|\*)\]')
+_readers = {}
+
+
+def _format(field_type):
+    code = getattr(field_type, '_type_', None)
+    size = ctypes.sizeof(field_type)
+    if code in _SIGNED:
+        return _INTEGERS[size]
+    if code in _UNSIGNED:
+        return _INTEGERS[size].upper()
+    if code in ('f', 'd'):
+        return _FLOATS[size]
+    if code == '?':
+        return '?'
+    if code == 'c':
+        return 'c'
+    raise ValueError("no struct format for {}".format(field_type.__name__))
+
+
+def _text(value):
+    # character arrays are NUL padded on the wire
+    return value.split(b'\0', 1)[0].decode('utf-8', 'replace')
+
+
+def parse_path(path):
+    """Splits 'm_lapData[*].m_totalDistance' into ['m_lapData', '*', 'm_totalDistance']."""
+    steps = []
+    # every field name but the first one follows a dot
+    dotted = '.' + path
+    position = 0
+    for match in _STEP.finditer(dotted):
+        if match.start() != position:
+            break
+        steps.append(match.group(1) or match.group(2))
+        position = match.end()
+    if position != len(dotted) or not steps:
+        raise ValueError("invalid field path {}".format(path))
+    return steps
+
+
+def resolve_step(field_type, step, path):
+    """
+    Type and offset within field_type of one step: a field name, an index or '*', which resolves to
+    the first element. Raises ValueError, mentioning path, if field_type has no such field or element.
+    """
+    if step == '*' or step.isdigit():
+        if not issubclass(field_type, ctypes.Array):
+            raise ValueError("not an array before [{}] in {}".format(step, path))
+        if step != '*' and int(step) >= field_type._length_:
+            raise ValueError("index {} out of range in {}".format(step, path))
+        item_type = field_type._type_
+        return item_type, 0 if step == '*' else int(step) * ctypes.sizeof(item_type)
+    fields = {name: member_type for name, member_type, *_ in getattr(field_type, '_fields_', [])}
+    if step not in fields:
+        raise ValueError("unknown field '{}' in {}".format(step, path))
+    return fields[step], getattr(field_type, step).offset
+
+
+def _layout(field_type, steps, offset, path):
+    """
+    Resolves steps against field_type into a list of (offset, format) leaves in memory order,
+    plus the number of array dimensions flattened into it (0 for a single value).
+    """
+    for position, step in enumerate(steps):
+        item_type, step_offset = resolve_step(field_type, step, path)
+        if step == '*':
+            size = ctypes.sizeof(item_type)
+            leaves = []
+            for index in range(field_type._length_):
+                item_leaves, dimensions = _layout(item_type, steps[position + 1:], offset + index * size, path)
+                leaves.extend(item_leaves)
+            return leaves, dimensions + 1
+        offset += step_offset
+        field_type = item_type
+
+    if issubclass(field_type, ctypes.Array):
+        if field_type._type_ is ctypes.c_char:
+            return [(offset, '{}s'.format(field_type._length_))], 0
+        item_type, size = field_type._type_, ctypes.sizeof(field_type._type_)
+        if issubclass(item_type, (ctypes.Structure, ctypes.Union, ctypes.Array)):
+            raise ValueError("{} must end at a value or an array of values".format(path))
+        return [(offset + index * size, _format(item_type)) for index in range(field_type._length_)], 1
+    if issubclass(field_type, (ctypes.Structure, ctypes.Union)):
+        raise ValueError("{} must end at a value or an array of values".format(path))
+    return [(offset, _format(field_type))], 0
+
+
+def compile_field(packet_type, path):
+    """
+    Compiles a field path against packet_type, e.g. compile_field(PacketLapData, 'm_lapData[0].m_totalDistance'),
+    into a reader function(buffer, offset=0) that unpacks the value straight from a received datagram.
+    Offsets and types are resolved once from the ctypes field descriptors and the reader is cached.
+
+    Paths ending at a single value return it; [*] wildcards and arrays of values return a tuple
+    of every selected value in memory order, read with one unpack_from call. Character arrays,
+    such as driver names, are returned as str, cut at the first NUL.
+    """
+    key = (packet_type, path)
+    reader = _readers.get(key)
+    if reader is not None:
+        return reader
+
+    leaves, dimensions = _layout(packet_type, parse_path(path), 0, path)
+    start = leaves[0][0]
+    parts = ['<']
+    position = start
+    for offset, code in leaves:
+        if offset > position:
+            parts.append('{}x'.format(offset - position))
+        parts.append(code)
+        position = offset + struct.calcsize('<' + code)
+    unpack_from = struct.Struct(''.join(parts)).unpack_from
+    text = any(code[-1] in 'sc' for _, code in leaves)
+
+    if not dimensions and text:
+        def reader(buffer, offset=0):
+            return _text(unpack_from(buffer, offset + start)[0])
+    elif not dimensions:
+        def reader(buffer, offset=0):
+            return unpack_from(buffer, offset + start)[0]
+    elif text:
+        def reader(buffer, offset=0):
+            return tuple(_text(value) for value in unpack_from(buffer, offset + start))
+    else:
+        def reader(buffer, offset=0):
+            return unpack_from(buffer, offset + start)
+
+    reader.size = position  # Minimum buffer length the reader needs
+    reader.dimensions = dimensions  # Array dimensions flattened into the returned tuple
+    _readers[key] = reader
+    return reader
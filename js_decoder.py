@@ -0,0 +1,124 @@
+import ctypes
+
+from f1_2019_struct import *
+
+# DataView reader prefix per ctypes type code, completed with the size in bits
+_KINDS = {
+    'b': 'i', 'h': 'i', 'i': 'i', 'l': 'i', 'q': 'i',
+    'B': 'u', 'H': 'u', 'I': 'u', 'L': 'u', 'Q': 'u',
+    'f': 'f', 'd': 'f',
+}
+
+_PRELUDE = '''// Generated by js_decoder.py from the _fields_ in f1_2019_struct.py, do not edit.
+// Decodes the binary WebSocket frames sent to clients connecting with the "{protocol}" subprotocol:
+//
+//     let ws = new WebSocket("ws://127.0.0.1:5678/", ["{protocol}"]);
+//     ws.binaryType = "arraybuffer";
+//     ws.onmessage = (event) => {{ let packet = F1_2019.decodePacket(event.data); }};
+const F1_2019 = (function () {{
+    const text = new TextDecoder();
+    const i8 = (v, o) => v.getInt8(o);
+    const u8 = (v, o) => v.getUint8(o);
+    const i16 = (v, o) => v.getInt16(o, true);
+    const u16 = (v, o) => v.getUint16(o, true);
+    const i32 = (v, o) => v.getInt32(o, true);
+    const u32 = (v, o) => v.getUint32(o, true);
+    const i64 = (v, o) => v.getBigInt64(o, true);
+    const u64 = (v, o) => v.getBigUint64(o, true);
+    const f32 = (v, o) => v.getFloat32(o, true);
+    const f64 = (v, o) => v.getFloat64(o, true);
+    const bool = (v, o) => v.getUint8(o) !== 0;
+
+    function array(v, o, length, size, decode) {{
+        const result = new Array(length);
+        for (let i = 0; i < length; i++) {{
+            result[i] = decode(v, o + i * size);
+        }}
+        return result;
+    }}
+
+    function string(v, o, length) {{
+        const bytes = new Uint8Array(v.buffer, v.byteOffset + o, length);
+        const end = bytes.indexOf(0);
+        return text.decode(end < 0 ? bytes : bytes.subarray(0, end));
+    }}
+'''
+
+
+def _reader(field_type):
+    """JavaScript expression of a (view, offset) function decoding field_type."""
+    if issubclass(field_type, (ctypes.Structure, ctypes.Union)):
+        return 'decode' + field_type.__name__
+    if issubclass(field_type, ctypes.Array):
+        if field_type._type_ is ctypes.c_char:
+            return '(v, o) => string(v, o, {})'.format(field_type._length_)
+        return '(v, o) => array(v, o, {}, {}, {})'.format(
+            field_type._length_, ctypes.sizeof(field_type._type_), _reader(field_type._type_))
+    code = getattr(field_type, '_type_', None)
+    if code == '?':
+        return 'bool'
+    if code not in _KINDS:
+        raise TypeError("no DataView reader for {}".format(field_type.__name__))
+    return '{}{}'.format(_KINDS[code], ctypes.sizeof(field_type) * 8)
+
+
+def _value(field_type, offset):
+    if issubclass(field_type, ctypes.Array):
+        if field_type._type_ is ctypes.c_char:
+            return 'string(v, o + {}, {})'.format(offset, field_type._length_)
+        return 'array(v, o + {}, {}, {}, {})'.format(
+            offset, field_type._length_, ctypes.sizeof(field_type._type_), _reader(field_type._type_))
+    return '{}(v, o + {})'.format(_reader(field_type), offset)
+
+
+def _structs(cls, seen):
+    """cls and every struct it contains, dependencies first."""
+    for _, field_type, *_ in getattr(cls, '_fields_', []):
+        while issubclass(field_type, ctypes.Array):
+            field_type = field_type._type_
+        if issubclass(field_type, (ctypes.Structure, ctypes.Union)):
+            yield from _structs(field_type, seen)
+    if cls not in seen:
+        seen.add(cls)
+        yield cls
+
+
+def _decoder(cls):
+    lines = ['    function decode{}(v, o) {{'.format(cls.__name__), '        return {']
+    for name, field_type, *_ in getattr(cls, '_fields_', []):
+        lines.append('            {}: {},'.format(name, _value(field_type, getattr(cls, name).offset)))
+    lines += ['        };', '    }', '']
+    return '\n'.join(lines)
+
+
+def generate(protocol='f1-2019-binary'):
+    """JavaScript source of a DataView decoder for every packet type in PACKET_TYPES."""
+    seen = set()
+    parts = [_PRELUDE.format(protocol=protocol)]
+    for packet_type in PACKET_TYPES.values():
+        parts.extend(_decoder(cls) for cls in _structs(packet_type, seen))
+
+    parts.append('    const decoders = {')
+    parts.extend('        {}: decode{},'.format(packet_id, packet_type.__name__)
+                 for packet_id, packet_type in PACKET_TYPES.items())
+    parts.append('    };')
+    parts.append('''
+    function decodePacket(buffer) {{
+        const v = new DataView(buffer);
+        const decode = decoders[v.getUint8({packet_id_offset})];
+        return decode === undefined ? null : decode(v, 0);
+    }}
+
+    return {{decodePacket: decodePacket, decoders: decoders}};
+}})();
+'''.format(packet_id_offset=PacketHeader.m_packetId.offset))
+    return '\n'.join(parts)
+
+
+def main():
+    with open('f1_2019_struct.js', 'w') as file:
+        file.write(generate())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+
+import numpy as np
+
+CARS = np.arange(20)
+TRACK_OFFSET = 1e6  # Distance added per car when all reference laps are searched as one array
+
+
+def interpolate(distance, time, at):
+    """
+    Lap time at the distances at, linearly interpolated in the sorted distance and time arrays.
+    Unlike np.interp, which converts and scans the whole arrays, this only binary searches them.
+    """
+    index = np.clip(np.searchsorted(distance, at, 'right'), 1, len(distance) - 1)
+    low, high = distance[index - 1], distance[index]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(high > low, (at - low) / (high - low), 0.0)
+    return time[index - 1] + weight * (time[index] - time[index - 1])
+
+
+class ReferenceLaps:
+    """
+    Fastest known lap per m_trackId as sorted (lap distance, lap time) arrays, shared by every session
+    on the same track. With a directory, laps are stored there as track_<id>.npz and so outlive the process.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.laps = {}  # Track id -> (distance, time, lap time)
+
+    def _path(self, track_id):
+        return os.path.join(self.directory, 'track_{}.npz'.format(track_id))
+
+    def get(self, track_id):
+        lap = self.laps.get(track_id)
+        if lap is None and self.directory is not None and os.path.exists(self._path(track_id)):
+            with np.load(self._path(track_id)) as stored:
+                lap = self.laps[track_id] = (stored['distance'], stored['time'], float(stored['lap_time']))
+        return lap
+
+    def offer(self, track_id, distance, time, lap_time):
+        """Keeps the lap if it is the fastest one on the track so far; returns whether it was kept."""
+        best = self.get(track_id)
+        if best is not None and best[2] <= lap_time:
+            return False
+        self.laps[track_id] = (distance, time, lap_time)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            np.savez(self._path(track_id), distance=distance, time=time, lap_time=lap_time)
+        return True
+
+
+class LapDeltaIndex:
+    """
+    Per-car index of m_lapDistance -> m_currentLapTime for the lap in progress, built from lap data,
+    plus the last and the best completed lap of every car as sorted arrays.
+
+    A lap time at any track position is a binary search and a linear interpolation in those arrays,
+    so deltas cost O(log n) per car and frame whatever the length of the session; the references of
+    all cars are searched together in one call.
+    """
+
+    def __init__(self, references=None, capacity=8192):
+        self.references = references if references is not None else ReferenceLaps()
+        self.track_id = None
+        self.capacity = capacity  # Samples per lap and car; 60 Hz for over two minutes
+        self.distance = np.zeros((20, capacity), dtype=np.float32)
+        self.time = np.zeros((20, capacity), dtype=np.float32)
+        self.count = np.zeros(20, dtype=np.int64)
+        self.lap_num = np.zeros(20, dtype=np.int64)
+        self.invalid = np.zeros(20, dtype=bool)  # Whether the lap in progress was invalidated
+        self.current = (np.zeros(20), np.zeros(20))  # Latest lap distance and lap time
+        self.last = [None] * 20  # Last completed lap per car, as (distance, time, lap time)
+        self.best = [None] * 20  # Fastest valid lap per car in this session
+        self._lookups = {}
+
+    def set_track(self, track_id):
+        if track_id != self.track_id:
+            self.track_id = track_id
+            self._lookups.pop('reference', None)
+
+    def update(self, laps):
+        """Adds one lap data sample of every car, laps being the m_lapData array of a NumPy packet view."""
+        lap_distance = laps['m_lapDistance'].astype(np.float64)
+        lap_time = laps['m_currentLapTime'].astype(np.float64)
+        lap_num = laps['m_currentLapNum'].astype(np.int64)
+
+        for car in np.flatnonzero((lap_num != self.lap_num) & (self.lap_num > 0)):
+            self._complete(car, float(laps['m_lastLapTime'][car]))
+        self.lap_num = lap_num
+        self.invalid |= laps['m_currentLapInvalid'] != 0
+
+        # Only samples beyond the last one keep the arrays sorted
+        count = self.count
+        last = self.distance[CARS, np.maximum(count - 1, 0)]
+        added = (lap_distance >= 0) & (count < self.capacity) & ((count == 0) | (lap_distance > last))
+        self.distance[CARS[added], count[added]] = lap_distance[added]
+        self.time[CARS[added], count[added]] = lap_time[added]
+        count[added] += 1
+        self.current = lap_distance, lap_time
+
+    def _complete(self, car, lap_time):
+        count = self.count[car]
+        lap = (self.distance[car, :count].copy(), self.time[car, :count].copy(), lap_time)
+        self.last[car] = lap
+        # Only full, valid laps make a reference: the trace must start at the line
+        if count and lap_time > 0 and not self.invalid[car] and lap[0][0] < 50:
+            if self.best[car] is None or lap_time < self.best[car][2]:
+                self.best[car] = lap
+                self._lookups.pop('best', None)
+            if self.track_id is not None and self.references.offer(self.track_id, *lap):
+                self._lookups.pop('reference', None)
+        self.count[car] = 0
+        self.invalid[car] = False
+
+    def _lookup(self, kind):
+        """Reference laps of all cars concatenated, each car's distances shifted by car * TRACK_OFFSET."""
+        lookup = self._lookups.get(kind)
+        if lookup is not None:
+            return lookup
+        if kind == 'best':
+            laps = self.best
+        else:
+            reference = self.references.get(self.track_id) if self.track_id is not None else None
+            laps = [reference] * 20
+        distance, time = [], []
+        low, high = np.full(20, np.inf), np.full(20, -np.inf)
+        for car, lap in enumerate(laps):
+            if lap is not None and len(lap[0]) > 1:
+                distance.append(lap[0] + car * TRACK_OFFSET)
+                time.append(lap[1])
+                low[car], high[car] = lap[0][0], lap[0][-1]
+        if distance:
+            lookup = np.concatenate(distance).astype(np.float64), np.concatenate(time).astype(np.float64), low, high
+        else:
+            lookup = np.zeros(0), np.zeros(0), low, high
+        self._lookups[kind] = lookup
+        return lookup
+
+    def _delta(self, kind):
+        distance, time, low, high = self._lookup(kind)
+        lap_distance, lap_time = self.current
+        covered = (lap_distance >= low) & (lap_distance <= high)
+        if not covered.any():
+            return np.full(20, np.nan)
+        reference = interpolate(distance, time, lap_distance + CARS * TRACK_OFFSET)
+        return np.where(covered, lap_time - reference, np.nan)
+
+    def delta_to_best(self):
+        """Seconds every car is up (negative) or down on its own best lap at its current position."""
+        return self._delta('best')
+
+    def delta_to_reference(self):
+        """Seconds every car is up or down on the fastest known lap of the track, from any session."""
+        return self._delta('reference')
+
+    def lap_time_at(self, car, lap_distance):
+        """
+        Time car took to reach lap_distance on its lap in progress or, if it hasn't got there yet,
+        on its last completed lap; None if neither covers that position.
+        """
+        count = self.count[car]
+        if count > 1 and self.distance[car, count - 1] >= lap_distance >= self.distance[car, 0]:
+            return float(interpolate(self.distance[car, :count], self.time[car, :count], lap_distance))
+        last = self.last[car]
+        if last is not None and len(last[0]) > 1 and last[0][-1] >= lap_distance >= last[0][0]:
+            return float(interpolate(last[0], last[1], lap_distance))
+        return None
+
+    def delta_to_car(self, car, other):
+        """Seconds car is behind (positive) other at car's current track position, None if unknown."""
+        lap_distance, lap_time = self.current
+        other_time = self.lap_time_at(other, lap_distance[car])
+        return None if other_time is None else float(lap_time[car]) - other_time
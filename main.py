@@ -6,115 +6,137 @@ import json
 
 import websockets
 
-from ctypes_json import CDataJSONEncoder
+from analytics import AnalyticsEngine
+from broadcast import BroadcastHub, TelemetryProtocol, select_protocol
+from capture import CaptureWriter
+from compression import DictionaryCompressor
+from ctypes_json import compile_encoder
+from metrics import Metrics
+from field_paths import compile_field
+from packet_registry import REGISTRY, text_default
 
 from f1_2019_struct import *
+from packet_ring import PacketRing
+from resample import ResamplingHub
+from session_state import SessionSnapshot, SessionStateEngine
+from shared_state import SharedStateWriter
+from subscriptions import SubscriptionHub
+
+
+car_0_distance = compile_field(PacketLapData, 'm_lapData[0].m_totalDistance')
+
+
+def recv_lap_distance(sock, ring):
+    """Receives datagrams into ring until a lap data packet arrives and reads car 0's total distance from it."""
+    while True:
+        packet = ring.recv_into(sock)
+        if type(packet) is PacketLapData:
+            return car_0_distance(packet)
 
 
 def telemetry():
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind(('', 27077))
+    ring = PacketRing()
 
     while True:
-        data, addr = sock.recvfrom(5000)
-        # print("received! Packet")
-        packet_header = PacketHeader.from_buffer_copy(data[0:23])
-        # print(packet_header.m_packetId)
-        if int(packet_header.m_packetId) == 0:
-            # print("Motion Packet")
-            # car_motion_data = PacketMotionData.from_buffer_copy(data[0:1343])
-            pass
-        elif int(packet_header.m_packetId) == 1:
-            # print("Session Packet")
-            packet_session_data = PacketSessionData.from_buffer_copy(data[0:149])
-        elif int(packet_header.m_packetId) == 2:
-            # print("Lap Data Packet")
-            packet_lap_data = PacketLapData.from_buffer_copy(data[0:843])
-            lap_data = packet_lap_data.m_lapData
-            print("Distance Car 0: ", lap_data[0].m_totalDistance)
-        elif int(packet_header.m_packetId) == 3:
-            pass
-            # print("Event Packet")
-        elif int(packet_header.m_packetId) == 4:
-            pass
-            # print("Participants Packet")
-        elif int(packet_header.m_packetId) == 5:
-            pass
-            # print("Car Setups Packet")
-        elif int(packet_header.m_packetId) == 6:
-            pass
-            # print("Car Telemetry Packet")
-            # packet_car_telemetry_data = PacketCarTelemetryData.from_buffer_copy(data[0:1347])
-            # car_0_telemetry_data = packet_car_telemetry_data.m_carTelemetryData[0]
-            # print("\tVelocity: ", car_0_telemetry_data.m_speed)
-        elif int(packet_header.m_packetId) == 7:
-            pass
-            # print("Car Status Packet")
-
-
-def udp_packet_to_json(data):
-    packet = ""
-    packet_header = PacketHeader.from_buffer_copy(data[0:23])
-    print(packet_header.m_packetId)
-    if int(packet_header.m_packetId) == 0:
-        packet = PacketMotionData.from_buffer_copy(data[0:1343])
-    elif int(packet_header.m_packetId) == 1:
-        packet = PacketSessionData.from_buffer_copy(data[0:149])
-    elif int(packet_header.m_packetId) == 2:
-        packet = PacketLapData.from_buffer_copy(data[0:843])
-    elif int(packet_header.m_packetId) == 3:
-        packet = PacketEventData.from_buffer_copy(data[0:32])
-    elif int(packet_header.m_packetId) == 4:
-        packet = PacketParticipantsData.from_buffer_copy(data[0:1104])
-        print("Number of Cars: ",packet.m_numCars)
-        json.dumps(packet.m_participants[0], cls=CDataJSONEncoder)
-    elif int(packet_header.m_packetId) == 5:
-        packet = PacketCarSetupData.from_buffer_copy(data[0:843])
-    elif int(packet_header.m_packetId) == 6:
-        packet = PacketCarTelemetryData.from_buffer_copy(data[0:1347])
-    elif int(packet_header.m_packetId) == 7:
-        packet = PacketCarStatusData.from_buffer_copy(data[0:1143])
-    return json.dumps(packet, cls=CDataJSONEncoder)
+        print("Distance Car 0: ", recv_lap_distance(sock, ring))
 
 
-def async_lap_distance():
+def record_telemetry(path):
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind(('', 27077))
+    buffer = bytearray(2048)
+    view = memoryview(buffer)
 
-    async def producer():
-        data, addr = sock.recvfrom(5000)
-        packet_header = PacketHeader.from_buffer_copy(data[0:23])
-        print(packet_header.m_packetId)
-        while int(packet_header.m_packetId) != 2:
-            pass
-        packet_lap_data = PacketLapData.from_buffer_copy(data[0:843])
-        lap_data = packet_lap_data.m_lapData
-        distance = str(lap_data[0].m_totalDistance)
-        return distance
-
-    async def producer_handler(websocket, path):
+    with CaptureWriter(path) as writer:
         while True:
-            message = await producer()
-            await websocket.send(message)
+            nbytes = sock.recv_into(buffer)
+            writer.record(view[:nbytes])
 
-    start_server = websockets.serve(producer_handler, "127.0.0.1", 5678)
-    asyncio.get_event_loop().run_until_complete(start_server)
-    asyncio.get_event_loop().run_forever()
 
+def packet_to_json(packet):
+    if packet is None:
+        return json.dumps("")
+    return REGISTRY.encode(packet)
 
-def send_lap_distance():
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(('', 27077))
 
-    async def total_distance(websocket, path):
-        while True:
-            data, addr = sock.recvfrom(1347)
-            json_string = udp_packet_to_json(data)
-            await websocket.send(json_string)
+class LapDistanceHub(BroadcastHub):
+    """Sends car 0's total distance to every client whenever a lap data packet arrives."""
 
-    start_server = websockets.serve(total_distance, "127.0.0.1", 5678)
-    asyncio.get_event_loop().run_until_complete(start_server)
-    asyncio.get_event_loop().run_forever()
+    def __init__(self, metrics=None):
+        super().__init__(lambda data: str(car_0_distance(data)), metrics=metrics)
+
+    def publish(self, data, spec):
+        if spec.packet_type is PacketLapData:
+            super().publish(data, spec)
+
+
+def async_lap_distance():
+    metrics = Metrics()
+    hub = LapDistanceHub(metrics)
+    metrics.hubs.append(hub)
+    asyncio.run(serve(hub, metrics))
+
+
+async def serve(hub, metrics, stages=(), **options):
+    loop = asyncio.get_running_loop()
+    await loop.create_datagram_endpoint(lambda: TelemetryProtocol(hub, metrics, stages), local_addr=('0.0.0.0', 27077))
+    await metrics.serve("127.0.0.1", 5679)
+    asyncio.ensure_future(metrics.watch_loop())
+
+    async with websockets.serve(hub.handler, "127.0.0.1", 5678, **options):
+        await asyncio.Future()
+
+
+def send_lap_distance(capture=None):
+    metrics = Metrics()
+    # clients may ask for aggregated motion and telemetry at their display rate, e.g. ws://127.0.0.1:5678/?rate=10
+    # and deflated JSON, negotiated with the f1-2019-json-zdict subprotocol
+    hub = ResamplingHub(packet_to_json, REGISTRY.decode, metrics=metrics, compressor=DictionaryCompressor())
+    metrics.hubs.append(hub)
+
+    # derived metrics go out as a 'derived' message next to the raw packets, once per frame
+    def send_derived(session):
+        if hub.subscribers:
+            hub.broadcast('derived', json.dumps({'derived': session.message()}))
+
+    analytics = AnalyticsEngine()
+    analytics.listeners.append(send_derived)
+
+    # and the merged state of all packet types as a 'state' message, see session_state
+    encode_state = compile_encoder(SessionSnapshot)
+
+    def send_state(snapshot):
+        if hub.subscribers:
+            hub.broadcast('state', json.dumps({'state': encode_state(snapshot)}, default=text_default))
+
+    session_state = SessionStateEngine()
+    session_state.listeners.append(send_state)
+    # latest packets for local processes, see shared_state.SharedStateReader
+    shared = SharedStateWriter()
+    stages = [analytics, session_state, shared]
+    # and, given a path, the raw feed to a capture file, see capture.CaptureReader
+    writer = CaptureWriter(capture) if capture is not None else None
+    if writer is not None:
+        stages.append(writer)
+    try:
+        asyncio.run(serve(hub, metrics, stages, select_subprotocol=select_protocol))
+    finally:
+        shared.close()
+        if writer is not None:
+            writer.close()
+
+
+def send_subscriptions():
+    metrics = Metrics()
+    hub = SubscriptionHub(metrics)
+    metrics.hubs.append(hub)
+    shared = SharedStateWriter()
+    try:
+        asyncio.run(serve(hub, metrics, [shared]))
+    finally:
+        shared.close()
 
 
 def websocket_test():
@@ -133,7 +155,8 @@ def websocket_test():
 def main():
     # websocket_test()
     # telemetry()
-    send_lap_distance()
+    # send_lap_distance()
+    send_subscriptions()
     # async_lap_distance()
 
 
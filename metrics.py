@@ -0,0 +1,172 @@
+import asyncio
+import bisect
+import time
+
+from packet_registry import LATE, LATE_FRAMES, REGISTRY, REWOUND, frame_order
+
+from f1_2019_struct import PACKET_TYPES
+
+# Upper bounds in seconds of the latency histogram buckets, 10 us to 1 s
+LATENCY_BUCKETS = [
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+]
+
+STAGES = ('decode', 'extract', 'encode', 'compress', 'send', 'latency', 'loop_lag')
+
+
+class FrameTracker:
+    """
+    Detects lost and reordered packets from gaps in m_frameIdentifier, per session and packet type.
+    Only packet types sent once per frame are tracked: motion, lap, telemetry and status data.
+
+    Frames missing from a gap count as lost; one that turns up late, see packet_registry.frame_order,
+    is credited back as reordered. A frame seen twice is a duplicate, and a restart or flashback
+    starts the stream over without counting anything.
+    """
+
+    def __init__(self, packet_ids=(0, 2, 6, 7)):
+        self.tracked = [packet_id in packet_ids for packet_id in range(256)]
+        self.frames = {}  # Per session, per packet id: None or [last frame, frames missing within LATE_FRAMES]
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+
+    def update(self, session_uid, packet_id, frame):
+        if not self.tracked[packet_id]:
+            return
+        frames = self.frames.get(session_uid)
+        if frames is None:
+            frames = self.frames[session_uid] = [None] * 256
+        stream = frames[packet_id]
+        if stream is None:
+            frames[packet_id] = [frame, set()]
+            self.received += 1
+            return
+        last, missing = stream
+        order = frame_order(last, frame)
+        if frame == last or (order is LATE and frame not in missing):
+            self.duplicates += 1
+            return
+        self.received += 1
+        if order is LATE:
+            # it was counted as lost when the gap showed up
+            missing.discard(frame)
+            self.reordered += 1
+            self.lost -= 1
+            return
+        if order is REWOUND:
+            missing.clear()
+        else:
+            self.lost += frame - last - 1
+            if missing:
+                missing.difference_update([missed for missed in missing if missed < frame - LATE_FRAMES])
+            missing.update(range(max(last + 1, frame - LATE_FRAMES), frame))
+        stream[0] = frame
+
+    def loss(self):
+        expected = self.received + self.lost
+        return self.lost / expected if expected else 0.0
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. The buckets are allocated once, observing a value only increments counters.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket counts values above every bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    """
+    Hot-path instrumentation of the live pipeline: packet counts per m_packetId, loss and reordering
+    from gaps in m_frameIdentifier, per-stage latency histograms, event loop lag and the outbox
+    statistics of every registered hub, rendered in the Prometheus text format by serve().
+    """
+
+    def __init__(self, registry=REGISTRY):
+        self.packets = [0] * 256  # Received packets per m_packetId
+        self.registry = registry  # Counts the malformed and unknown datagrams it rejected
+        self.frames = FrameTracker()
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.hubs = []  # Hubs whose per-client outbox statistics are reported
+        self.stage_errors = {}  # Exceptions raised by each pipeline stage class, see TelemetryProtocol
+
+    def received(self, data, spec):
+        """Counts a datagram the registry dispatched to spec."""
+        session_uid, _, frame = self.registry.session(data)
+        self.packets[spec.packet_id] += 1
+        self.frames.update(session_uid, spec.packet_id, frame)
+
+    def observe(self, stage, seconds):
+        self.histograms[stage].observe(seconds)
+
+    async def watch_loop(self, interval=0.1):
+        """Measures how late the event loop wakes up from a sleep of interval seconds."""
+        histogram = self.histograms['loop_lag']
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            histogram.observe(max(0.0, time.perf_counter() - start - interval))
+
+    def render(self):
+        lines = ['# TYPE f1_packets_received_total counter']
+        for packet_id, packet_type in PACKET_TYPES.items():
+            lines.append('f1_packets_received_total{{packet="{}"}} {}'.format(
+                packet_type.__name__, self.packets[packet_id]))
+        lines += [
+            '# TYPE f1_packets_malformed_total counter',
+            'f1_packets_malformed_total {}'.format(self.registry.malformed),
+            '# TYPE f1_packets_unknown_total counter',
+            'f1_packets_unknown_total {}'.format(self.registry.unknown),
+            '# TYPE f1_packets_lost_total counter',
+            'f1_packets_lost_total {}'.format(self.frames.lost),
+            '# TYPE f1_packets_reordered_total counter',
+            'f1_packets_reordered_total {}'.format(self.frames.reordered),
+            '# TYPE f1_packets_duplicate_total counter',
+            'f1_packets_duplicate_total {}'.format(self.frames.duplicates),
+            '# TYPE f1_stage_errors_total counter',
+        ]
+        for stage, errors in self.stage_errors.items():
+            lines.append('f1_stage_errors_total{{stage="{}"}} {}'.format(stage, errors))
+        lines.append('# TYPE f1_stage_seconds histogram')
+        for stage, histogram in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append('f1_stage_seconds_bucket{{stage="{}",le="{}"}} {}'.format(stage, bound, cumulative))
+            lines.append('f1_stage_seconds_sum{{stage="{}"}} {}'.format(stage, histogram.sum))
+            lines.append('f1_stage_seconds_count{{stage="{}"}} {}'.format(stage, histogram.count))
+        lines.append('# TYPE f1_client_outbox gauge')
+        for hub in self.hubs:
+            for client in hub.stats():
+                labels = 'client="{}"'.format(client['client'])
+                for key in ('pending', 'sent', 'conflated', 'dropped'):
+                    lines.append('f1_client_outbox{{{},stat="{}"}} {}'.format(labels, key, client[key]))
+        return '\n'.join(lines) + '\n'
+
+    async def _handle(self, reader, writer):
+        try:
+            await reader.readuntil(b'\r\n\r\n')
+            body = self.render().encode()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                         b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(body) + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def serve(self, host='127.0.0.1', port=5679):
+        """Coroutine starting the HTTP metrics endpoint; every path returns the metrics."""
+        return asyncio.start_server(self._handle, host, port)
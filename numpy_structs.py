@@ -0,0 +1,67 @@
+import ctypes
+
+import numpy as np
+
+_KINDS = {
+    'b': 'i', 'h': 'i', 'i': 'i', 'l': 'i', 'q': 'i',
+    'B': 'u', 'H': 'u', 'I': 'u', 'L': 'u', 'Q': 'u',
+    'f': 'f', 'd': 'f', 'g': 'f',
+}
+
+_dtypes = {}
+
+
+def packet_dtype(cls):
+    """
+    Packed little-endian NumPy structured dtype mirroring the ctypes Structure/Union cls.
+    Derived from _fields_ and the ctypes field offsets, so it follows every change to f1_2019_struct.
+    """
+    dtype = _dtypes.get(cls)
+    if dtype is not None:
+        return dtype
+
+    names, formats, offsets = [], [], []
+    for name, field_type, *bits in getattr(cls, '_fields_', []):
+        if bits:
+            raise TypeError("bit field {}.{} has no NumPy equivalent".format(cls.__name__, name))
+        names.append(name)
+        formats.append(_field_dtype(field_type))
+        offsets.append(getattr(cls, name).offset)
+
+    dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': ctypes.sizeof(cls)})
+    _dtypes[cls] = dtype
+    return dtype
+
+
+def _field_dtype(field_type):
+    if issubclass(field_type, (ctypes.Structure, ctypes.Union)):
+        return packet_dtype(field_type)
+
+    if issubclass(field_type, ctypes.Array):
+        if field_type._type_ is ctypes.c_char:
+            return np.dtype('S{}'.format(field_type._length_))
+        shape = []
+        while issubclass(field_type, ctypes.Array):
+            shape.append(field_type._length_)
+            field_type = field_type._type_
+        return np.dtype((_field_dtype(field_type), tuple(shape)))
+
+    code = getattr(field_type, '_type_', None)
+    if code == 'c':
+        return np.dtype('S1')
+    if code == '?':
+        return np.dtype('?')
+    if code in _KINDS:
+        return np.dtype('<{}{}'.format(_KINDS[code], ctypes.sizeof(field_type)))
+    raise TypeError("no NumPy equivalent for {}".format(field_type.__name__))
+
+
+def decode_batch(packet_type, data, count=-1, offset=0):
+    """
+    Decodes count packets of packet_type laid out back to back in data with a single np.frombuffer call.
+    The result is a read-only view of data, e.g. for a race of telemetry packets
+
+        batch = decode_batch(PacketCarTelemetryData, data)
+        speed = batch['m_carTelemetryData']['m_speed']  # speed[packet, car]
+    """
+    return np.frombuffer(data, dtype=packet_dtype(packet_type), count=count, offset=offset)
@@ -0,0 +1,111 @@
+import ctypes
+import json
+import struct
+
+from ctypes_json import compile_encoder
+
+from f1_2019_struct import PACKET_TYPES, PacketHeader
+
+HEADER_SIZE = ctypes.sizeof(PacketHeader)
+# m_packetFormat and m_packetId, read straight from the datagram
+_FORMAT_AND_ID = struct.Struct('<H{}xB'.format(PacketHeader.m_packetId.offset - PacketHeader.m_gameMajorVersion.offset))
+# m_sessionUID, m_sessionTime and m_frameIdentifier
+_SESSION = struct.Struct('<QfI')
+SESSION_OFFSET = PacketHeader.m_sessionUID.offset
+
+# Frames a datagram can fall behind the newest one of its stream by being reordered in transit.
+# F1 2019 also rewinds m_frameIdentifier, on a restart and on a flashback, by more than this.
+LATE_FRAMES = 10
+LATE = 'late'
+REWOUND = 'rewound'
+
+
+def text_default(value):
+    """json.dumps default encoding the bytes ctypes returns for character arrays as str."""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+
+def frame_order(last, frame, late_frames=LATE_FRAMES):
+    """
+    How frame follows last, the newest frame seen of the same stream: None if it isn't older,
+    LATE if it is at most late_frames behind and REWOUND if the game jumped back further.
+    """
+    if last is None or frame >= last:
+        return None
+    return LATE if last - frame <= late_frames else REWOUND
+
+
+class PacketSpec:
+    """
+    Everything needed to handle one packet type, built once: the struct, its size, a decoder
+    copying a datagram into a new struct and an encoder turning a struct into a JSON message.
+    """
+
+    def __init__(self, packet_format, packet_id, packet_type):
+        self.packet_format = packet_format
+        self.packet_id = packet_id
+        self.packet_type = packet_type
+        self.size = ctypes.sizeof(packet_type)
+        self.decode = packet_type.from_buffer_copy
+        to_json = compile_encoder(packet_type)
+        self.encode = lambda packet: json.dumps(to_json(packet), default=text_default)
+
+
+class PacketRegistry:
+    """
+    Packet types by (m_packetFormat, m_packetId). dispatch() is the one entry point for datagrams on
+    every ingest path: two header fields, a list lookup and a length check against ctypes.sizeof,
+    counting rejected datagrams instead of raising. Each datagram is dispatched once, where it is
+    received; everything downstream is handed its PacketSpec along with it.
+    """
+
+    def __init__(self):
+        self.specs = {}  # (packet format, packet id) -> PacketSpec
+        self.by_type = {}  # Struct class -> PacketSpec
+        self._formats = {}  # Packet format -> PacketSpec per packet id 0-255, None if not registered
+        self.malformed = 0  # Datagrams shorter than a header or than their struct
+        self.unknown = 0  # Datagrams of an unregistered packet format or id
+
+    def register(self, packet_format, packet_id, packet_type):
+        spec = PacketSpec(packet_format, packet_id, packet_type)
+        self.specs[(packet_format, packet_id)] = spec
+        self.by_type[packet_type] = spec
+        self._formats.setdefault(packet_format, [None] * 256)[packet_id] = spec
+        return spec
+
+    def dispatch(self, data):
+        """PacketSpec of the datagram, or None if it is malformed or of an unknown type."""
+        if len(data) < HEADER_SIZE:
+            self.malformed += 1
+            return None
+        packet_format, packet_id = _FORMAT_AND_ID.unpack_from(data)
+        specs = self._formats.get(packet_format)
+        spec = specs[packet_id] if specs is not None else None
+        if spec is None:
+            self.unknown += 1
+            return None
+        if len(data) < spec.size:
+            self.malformed += 1
+            return None
+        return spec
+
+    def decode(self, data, spec=None):
+        """The datagram copied into its struct, or None if it doesn't dispatch. spec skips the dispatch."""
+        if spec is None:
+            spec = self.dispatch(data)
+        return spec.decode(data) if spec is not None else None
+
+    @staticmethod
+    def session(data):
+        """(m_sessionUID, m_sessionTime, m_frameIdentifier) of a dispatched datagram."""
+        return _SESSION.unpack_from(data, SESSION_OFFSET)
+
+    def encode(self, packet):
+        return self.by_type[type(packet)].encode(packet)
+
+
+REGISTRY = PacketRegistry()
+for _packet_id, _packet_type in PACKET_TYPES.items():
+    REGISTRY.register(2019, _packet_id, _packet_type)
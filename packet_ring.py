@@ -0,0 +1,39 @@
+from packet_registry import REGISTRY
+
+
+class PacketRing:
+    """
+    Ring of preallocated receive buffers with every packet struct mapped onto each slot up front.
+    Receiving and decoding a packet allocates nothing: the datagram lands in the next slot, the registry
+    dispatches it and the matching view is looked up. A returned packet stays valid until the ring wraps around.
+
+    This pays off for blocking loops that own their socket. Datagrams asyncio already received as bytes
+    are cheaper to decode with PacketSpec.decode than to copy into a slot first.
+    """
+
+    def __init__(self, slots=16, slot_size=None, registry=REGISTRY):
+        self.registry = registry
+        specs = list(registry.specs.values())
+        self.slot_size = slot_size or max(spec.size for spec in specs)
+        self.buffers = [bytearray(self.slot_size) for _ in range(slots)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+        self.packets = [
+            {spec: spec.packet_type.from_buffer(buffer) for spec in specs if spec.size <= self.slot_size}
+            for buffer in self.buffers
+        ]
+        self.index = 0
+
+    def recv_into(self, sock):
+        """Receives the next datagram from sock straight into the ring and returns the decoded packet."""
+        index = self._advance()
+        nbytes = sock.recv_into(self.buffers[index])
+        return self._decode(index, nbytes)
+
+    def _advance(self):
+        index = self.index
+        self.index = index + 1 if index + 1 < len(self.buffers) else 0
+        return index
+
+    def _decode(self, index, nbytes):
+        spec = self.registry.dispatch(self.views[index][:nbytes])
+        return self.packets[index].get(spec) if spec is not None else None
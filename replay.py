@@ -0,0 +1,170 @@
+import argparse
+import heapq
+import math
+import socket
+import time
+
+from metrics import FrameTracker
+from packet_registry import HEADER_SIZE
+from packet_ring import PacketRing
+
+from f1_2019_struct import *
+
+
+def synthetic_packets(session_uid, duration, rate=60.0, num_cars=20):
+    """
+    Plausible F1 2019 traffic for one game instance: motion, lap, telemetry and status data every
+    frame and session data twice a second. Yields (session time, packet); the packet objects are
+    reused, so send each one before asking for the next.
+    """
+    motion, lap, telemetry, session = PacketMotionData(), PacketLapData(), PacketCarTelemetryData(), PacketSessionData()
+    status = PacketCarStatusData()
+    per_frame = [(0, motion), (2, lap), (6, telemetry), (7, status)]
+    track_length = 5000
+    session.m_header.m_packetId = 1
+    session.m_trackLength = track_length
+    session.m_totalLaps = 50
+
+    for frame in range(int(duration * rate)):
+        session_time = frame / rate
+        for packet_id, packet in per_frame:
+            header = packet.m_header
+            header.m_packetFormat = 2019
+            header.m_packetId = packet_id
+            header.m_sessionUID = session_uid
+            header.m_sessionTime = session_time
+            header.m_frameIdentifier = frame
+
+        for car in range(num_cars):
+            speed = 200 + 100 * math.sin(session_time + car)
+            distance = session_time * 70 - car * 20
+            lap_data = lap.m_lapData[car]
+            lap_data.m_totalDistance = distance
+            lap_data.m_lapDistance = distance % track_length
+            lap_data.m_currentLapNum = int(distance // track_length) + 1
+            lap_data.m_currentLapTime = (distance % track_length) / 70
+            lap_data.m_lastLapTime = track_length / 70 if distance >= track_length else 0
+            lap_data.m_carPosition = car + 1
+            lap_data.m_sector = int(3 * (distance % track_length) / track_length)
+            lap_data.m_resultStatus = 2
+            telemetry.m_carTelemetryData[car].m_speed = int(speed)
+            telemetry.m_carTelemetryData[car].m_throttle = 0.5 + 0.5 * math.cos(session_time)
+            status_data = status.cars_status_data[car]
+            status_data.m_fuelCapacity = 110
+            status_data.m_fuelInTank = 100 - distance / track_length * 1.8
+            status_data.m_fuelRemainingLaps = status_data.m_fuelInTank / 1.8
+            status_data.m_tyresWear[:] = [min(int(distance / track_length * 2), 100)] * 4
+            status_data.m_ersStoreEnergy = 2e6 + 1e6 * math.sin(session_time)
+            status_data.m_ersDeployMode = 2
+            motion.cars_motion_data[car].m_worldPositionX = 100 * math.cos(distance / 800)
+            motion.cars_motion_data[car].m_worldPositionZ = 100 * math.sin(distance / 800)
+
+        for packet_id, packet in per_frame:
+            yield session_time, packet
+        if frame % int(rate / 2) == 0:
+            header = session.m_header
+            header.m_packetFormat = 2019
+            header.m_sessionUID = session_uid
+            header.m_sessionTime = session_time
+            header.m_frameIdentifier = frame
+            yield session_time, session
+
+
+def captured_packets(path, session_uid=None):
+    """
+    Datagrams of a capture file with their session time, optionally rewritten to session_uid.
+    Rewritten datagrams share one buffer, so send each one before asking for the next.
+    """
+    from capture import CaptureReader
+
+    reader = CaptureReader(path)
+    buffer = bytearray(65536)
+    view = memoryview(buffer)
+    header = PacketHeader.from_buffer(buffer)
+    times = reader.entries['m_sessionTime'].tolist()
+    for entry, session_time in zip(reader.entries, times):
+        datagram = reader.datagram(entry)
+        if session_uid is None or len(datagram) < HEADER_SIZE:
+            yield session_time, datagram
+            continue
+        length = len(datagram)
+        view[:length] = datagram
+        header.m_sessionUID = session_uid
+        yield session_time, view[:length]
+
+
+def replay(streams, address=('127.0.0.1', 27077), speed=1.0):
+    """
+    Sends the merged streams of (session time, packet) to address.
+    speed scales the original m_sessionTime spacing; 0 sends as fast as possible.
+    Returns the number of packets sent and the achieved packets per second.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
+    start = time.perf_counter()
+    first_time = None
+
+    for session_time, packet in heapq.merge(*streams, key=lambda item: item[0]):
+        if speed:
+            if first_time is None:
+                first_time = session_time
+            delay = start + (session_time - first_time) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sock.sendto(packet, address)
+        sent += 1
+
+    elapsed = time.perf_counter() - start
+    return sent, sent / elapsed if elapsed else 0.0
+
+
+def measure(port, interval=1.0):
+    """Listens on port and prints the received packet rate and the loss derived from m_frameIdentifier."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('', port))
+    ring = PacketRing()
+    tracker = FrameTracker()
+    last_report, last_received = time.perf_counter(), 0
+
+    while True:
+        packet = ring.recv_into(sock)
+        if packet is None:
+            continue
+        header = packet.m_header
+        tracker.update(header.m_sessionUID, header.m_packetId, header.m_frameIdentifier)
+        now = time.perf_counter()
+        if now - last_report >= interval:
+            rate = (tracker.received - last_received) / (now - last_report)
+            print("{:10.0f} packets/s  lost {}  reordered {}  loss {:.3%}".format(
+                rate, tracker.lost, tracker.reordered, tracker.loss()))
+            last_report, last_received = now, tracker.received
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay or synthesise F1 2019 UDP traffic")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=27077)
+    parser.add_argument('--capture', help="capture file to replay instead of synthetic traffic")
+    parser.add_argument('--instances', type=int, default=1, help="concurrent game instances")
+    parser.add_argument('--speed', type=float, default=1.0, help="speed-up factor, 0 for flat-out")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds of synthetic traffic")
+    parser.add_argument('--rate', type=float, default=60.0, help="synthetic frames per second")
+    parser.add_argument('--measure', action='store_true', help="receive on --port and report loss")
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.port)
+        return
+
+    if args.capture:
+        streams = [captured_packets(args.capture, None if args.instances == 1 else instance + 1)
+                   for instance in range(args.instances)]
+    else:
+        streams = [synthetic_packets(instance + 1, args.duration, args.rate) for instance in range(args.instances)]
+
+    sent, rate = replay(streams, (args.host, args.port), args.speed)
+    print("sent {} packets at {:.0f} packets/s".format(sent, rate))
+
+
+if __name__ == "__main__":
+    main()
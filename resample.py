@@ -0,0 +1,178 @@
+import json
+import math
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from broadcast import BINARY_PROTOCOL, BroadcastHub
+from numpy_structs import packet_dtype
+
+from f1_2019_struct import PACKET_TYPES
+
+# Per packet id: the per-car array whose numeric fields are aggregated
+RESAMPLED = {
+    0: 'cars_motion_data',
+    6: 'm_carTelemetryData',
+}
+# Query parameter naming the rate of each stream, e.g. ws://127.0.0.1:5678/?motion=10&telemetry=20
+STREAMS = {
+    'motion': 0,
+    'telemetry': 6,
+}
+
+
+def parse_rates(path, max_rate=60.0):
+    """
+    Output rate in Hz per resampled packet id requested by the query string of path:
+    rate=<Hz> sets every stream, motion=<Hz> and telemetry=<Hz> single ones.
+    Rates at or above max_rate mean no resampling and are left out.
+    """
+    rates = {}
+    for name, value in parse_qsl(urlsplit(path or '').query):
+        packet_ids = STREAMS.values() if name == 'rate' else [STREAMS.get(name)]
+        try:
+            rate = float(value)
+        except ValueError:
+            continue
+        for packet_id in packet_ids:
+            if packet_id is not None and 0 < rate < max_rate:
+                rates[packet_id] = rate
+    return rates
+
+
+class IntervalAggregator:
+    """
+    Running last, min, max and mean of every numeric per-car field of one packet type over
+    consecutive intervals of session time. Adding a packet is a handful of vectorized array
+    operations; a message is only built when an interval is complete.
+    """
+
+    def __init__(self, packet_id, interval):
+        self.dtype = packet_dtype(PACKET_TYPES[packet_id])
+        self.cars_field = RESAMPLED[packet_id]
+        self.interval = interval
+        cars_dtype = self.dtype[self.cars_field].base
+        self.fields = []  # (name, first column, last column, shape of the field)
+        columns = 0
+        for name in cars_dtype.names:
+            shape = cars_dtype[name].shape
+            width = math.prod(shape)
+            self.fields.append((name, columns, columns + width, shape))
+            columns += width
+        self.sum = np.zeros((20, columns))
+        self.min = np.zeros((20, columns))
+        self.max = np.zeros((20, columns))
+        self.last = np.zeros((20, columns))
+        self.values = np.zeros((20, columns))
+        self.count = 0
+        self.start = None  # Session time the current interval started at
+        self.header = None
+
+    def add(self, data):
+        """Adds one datagram; returns the message of the interval it completed, if any."""
+        packet = np.frombuffer(data, dtype=self.dtype, count=1)[0]
+        header = packet['m_header']
+        session_time = float(header['m_sessionTime'])
+        message = None
+        if self.start is None or session_time < self.start:
+            # first packet, or a restarted session
+            self.start, self.count = session_time, 0
+        elif session_time >= self.start + self.interval:
+            if self.count:
+                message = self.message()
+            # at least one interval: rounding can put session_time a hair short of the boundary it passed
+            self.start += self.interval * max(1, math.floor((session_time - self.start) / self.interval))
+            self.count = 0
+
+        # gather every field into one float row per car, so the aggregates are one operation each
+        cars = packet[self.cars_field]
+        values = self.values
+        for name, first, last, _ in self.fields:
+            values[:, first:last] = cars[name].reshape(20, last - first)
+        if self.count:
+            self.sum += values
+            np.minimum(self.min, values, out=self.min)
+            np.maximum(self.max, values, out=self.max)
+        else:
+            self.sum[:] = self.min[:] = self.max[:] = values
+        self.last[:] = values
+        self.header = header
+        self.count += 1
+        return message
+
+    def message(self):
+        header = self.header
+        mean = self.sum / self.count
+        return {
+            'm_packetId': int(header['m_packetId']),
+            'm_sessionUID': int(header['m_sessionUID']),
+            'm_sessionTime': self.start,
+            'm_frameIdentifier': int(header['m_frameIdentifier']),
+            'interval': self.interval,
+            'samples': self.count,
+            'aggregates': {
+                aggregate: {
+                    name: values[:, first:last].reshape((20,) + shape).tolist()
+                    for name, first, last, shape in self.fields
+                }
+                for aggregate, values in (('last', self.last), ('min', self.min), ('max', self.max), ('mean', mean))
+            },
+        }
+
+
+class ResamplingHub(BroadcastHub):
+    """
+    BroadcastHub whose JSON clients can ask for motion and telemetry at a lower rate than the game sends
+    them, see parse_rates. Those clients get one aggregate message per interval instead of every packet;
+    each (stream, rate) is aggregated and encoded once however many clients share it, so encode and send
+    costs follow the rates clients display rather than the game's send rate. Other streams, clients
+    without rates and binary clients are served as by BroadcastHub.
+    """
+
+    def __init__(self, encode, decode=None, outbox_size=16, metrics=None, compressor=None, max_rate=60.0):
+        super().__init__(encode, decode, outbox_size, metrics, compressor)
+        self.max_rate = max_rate
+        self.groups = {}  # Packet id -> rate -> [IntervalAggregator, outboxes]
+        self.rates = {}  # Requested rates per connected client
+        self.resampled = {}  # Packet id -> outboxes getting aggregates instead of packets
+
+    def receivers(self, key):
+        resampled = self.resampled.get(key)
+        if not resampled:
+            return self.subscribers.values()
+        return [outbox for outbox in self.subscribers.values() if outbox not in resampled]
+
+    def publish(self, data, spec):
+        groups = self.groups.get(spec.packet_id)
+        if groups:
+            for aggregator, outboxes in groups.values():
+                message = aggregator.add(data)
+                if message is not None:
+                    self.deliver(outboxes, spec.packet_id, json.dumps(message))
+        super().publish(data, spec)
+
+    def subscribe(self, websocket, binary=False):
+        outbox = super().subscribe(websocket, binary)
+        for packet_id, rate in (self.rates.get(websocket, {}) if not binary else {}).items():
+            group = self.groups.setdefault(packet_id, {}).get(rate)
+            if group is None:
+                group = self.groups[packet_id][rate] = [IntervalAggregator(packet_id, 1 / rate), set()]
+            group[1].add(outbox)
+            self.resampled.setdefault(packet_id, set()).add(outbox)
+        return outbox
+
+    def unsubscribe(self, websocket):
+        outbox = self.subscribers.get(websocket)
+        for packet_id, rate in self.rates.pop(websocket, {}).items():
+            outboxes = self.groups[packet_id][rate][1]
+            outboxes.discard(outbox)
+            self.resampled[packet_id].discard(outbox)
+            if not outboxes:
+                del self.groups[packet_id][rate]
+        super().unsubscribe(websocket)
+
+    async def handler(self, websocket, path=None):
+        if websocket.subprotocol != BINARY_PROTOCOL:
+            path = path or websocket.request.path
+            self.rates[websocket] = parse_rates(path, self.max_rate)
+        await super().handler(websocket)
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+import websockets
+
+from broadcast import BroadcastHub, select_protocol
+from compression import DictionaryCompressor
+from packet_registry import REGISTRY
+
+
+def session_hub(compressor=None):
+    """BroadcastHub of one session, decoding each packet once for all of its clients."""
+    return BroadcastHub(REGISTRY.encode, REGISTRY.decode, compressor=compressor)
+
+
+class RigProtocol(asyncio.DatagramProtocol):
+    """
+    Asyncio UDP endpoint handing every datagram and its source address to a SessionRouter.
+    """
+
+    def __init__(self, router):
+        self.router = router
+
+    def datagram_received(self, data, addr):
+        self.router.route(data, addr)
+
+
+class SessionRouter:
+    """
+    Demultiplexes datagrams from many rigs by source address and m_sessionUID into one isolated hub
+    per session. WebSocket clients pick a session by path: /sessions lists the known sessions and
+    /sessions/<name> streams one of them.
+
+    With several worker processes, registry is a dict shared between them mapping every session
+    name to the WebSocket port of the worker that owns it.
+    """
+
+    def __init__(self, make_hub=session_hub, registry=None, ws_port=None, idle_timeout=600):
+        self.make_hub = make_hub
+        self.registry = registry if registry is not None else {}
+        self.ws_port = ws_port
+        self.idle_timeout = idle_timeout
+        self.sessions = {}  # (source host, session UID) -> [name, hub, last seen]
+        self.hubs = {}  # Session name -> hub
+
+    def route(self, data, addr):
+        spec = REGISTRY.dispatch(data)
+        if spec is None:
+            return
+        key = (addr[0], REGISTRY.session(data)[0])
+        session = self.sessions.get(key)
+        if session is None:
+            session = self._open(key)
+        session[2] = time.monotonic()
+        session[1].publish(data, spec)
+
+    def _open(self, key):
+        host, session_uid = key
+        name = '{}-{:016x}'.format(host, session_uid)
+        hub = self.make_hub()
+        session = self.sessions[key] = [name, hub, time.monotonic()]
+        self.hubs[name] = hub
+        self.registry[name] = self.ws_port
+        return session
+
+    def expire(self):
+        """Forgets sessions that sent nothing for idle_timeout seconds."""
+        now = time.monotonic()
+        for key, (name, hub, last_seen) in list(self.sessions.items()):
+            if now - last_seen > self.idle_timeout and not hub.subscribers and not hub.binary_subscribers:
+                del self.sessions[key]
+                del self.hubs[name]
+                self.registry.pop(name, None)
+
+    async def handler(self, websocket, path=None):
+        path = path or websocket.request.path
+        name = path[len('/sessions/'):] if path.startswith('/sessions/') else None
+        hub = self.hubs.get(name)
+        if hub is not None:
+            await hub.handler(websocket)
+        elif name:
+            await websocket.close(1008, 'unknown session, see /sessions')
+        else:
+            await websocket.send(json.dumps(dict(self.registry)))
+
+
+async def serve(udp_ports, ws_port, registry=None, reuse_port=False, host='0.0.0.0'):
+    """Ingests every port in udp_ports into one SessionRouter and serves its sessions on ws_port."""
+    compressor = DictionaryCompressor()
+    router = SessionRouter(lambda: session_hub(compressor), registry, ws_port)
+    loop = asyncio.get_running_loop()
+    for port in udp_ports:
+        await loop.create_datagram_endpoint(lambda: RigProtocol(router), local_addr=(host, port),
+                                            reuse_port=reuse_port)
+
+    async with websockets.serve(router.handler, '127.0.0.1', ws_port, select_subprotocol=select_protocol):
+        while True:
+            await asyncio.sleep(router.idle_timeout / 10)
+            router.expire()
+
+
+def run_worker(udp_ports, ws_port, registry, reuse_port):
+    asyncio.run(serve(udp_ports, ws_port, registry, reuse_port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many concurrent F1 2019 sessions")
+    parser.add_argument('--ports', type=int, nargs='+', default=[27077], help="UDP ports to ingest")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help="worker processes")
+    parser.add_argument('--ws-port', type=int, default=5678, help="WebSocket port of the first worker")
+    args = parser.parse_args()
+
+    # With at least one port per worker the ports are split between the workers. Otherwise every worker
+    # binds every port with SO_REUSEPORT and the kernel keeps each rig's flow on one worker.
+    workers = max(1, args.workers)
+    reuse_port = len(args.ports) < workers
+    groups = [args.ports] * workers if reuse_port else [args.ports[index::workers] for index in range(workers)]
+
+    with multiprocessing.Manager() as manager:
+        registry = manager.dict()
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(ports, args.ws_port + index, registry, reuse_port))
+            for index, ports in enumerate(groups)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
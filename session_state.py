@@ -0,0 +1,193 @@
+import ctypes
+
+import numpy as np
+
+from numpy_structs import packet_dtype
+from packet_registry import LATE, REWOUND, frame_order
+
+from f1_2019_struct import *
+
+
+class CarState(ctypes.LittleEndianStructure):
+    """
+    Latest known state of one car, merged from all packet types.
+    Field names match the per-car structs they are copied from.
+    """
+    _pack_ = 1
+    _fields_ = [
+        # CarMotionData
+        ('m_worldPositionX', ctypes.c_float),
+        ('m_worldPositionY', ctypes.c_float),
+        ('m_worldPositionZ', ctypes.c_float),
+        ('m_gForceLateral', ctypes.c_float),
+        ('m_gForceLongitudinal', ctypes.c_float),
+        ('m_yaw', ctypes.c_float),
+        # LapData
+        ('m_lastLapTime', ctypes.c_float),
+        ('m_currentLapTime', ctypes.c_float),
+        ('m_bestLapTime', ctypes.c_float),
+        ('m_lapDistance', ctypes.c_float),
+        ('m_totalDistance', ctypes.c_float),
+        ('m_carPosition', ctypes.c_ubyte),
+        ('m_currentLapNum', ctypes.c_ubyte),
+        ('m_pitStatus', ctypes.c_ubyte),
+        ('m_sector', ctypes.c_ubyte),
+        ('m_resultStatus', ctypes.c_ubyte),
+        # CarTelemetryData
+        ('m_speed', ctypes.c_ushort),
+        ('m_throttle', ctypes.c_float),
+        ('m_brake', ctypes.c_float),
+        ('m_gear', ctypes.c_byte),
+        ('m_engineRPM', ctypes.c_ushort),
+        ('m_drs', ctypes.c_ubyte),
+        ('m_tyresSurfaceTemperature', ctypes.c_ushort * 4),
+        # CarStatusData
+        ('m_fuelInTank', ctypes.c_float),
+        ('m_tyresWear', ctypes.c_ubyte * 4),
+        ('m_actualTyreCompound', ctypes.c_ubyte),
+        ('m_ersStoreEnergy', ctypes.c_float),
+        ('m_ersDeployMode', ctypes.c_ubyte),
+        # ParticipantData
+        ('m_aiControlled', ctypes.c_ubyte),
+        ('m_driverId', ctypes.c_ubyte),
+        ('m_teamId', ctypes.c_ubyte),
+        ('m_raceNumber', ctypes.c_ubyte),
+        ('m_name', ctypes.c_char * 48),
+    ]
+
+
+class SessionSnapshot(ctypes.LittleEndianStructure):
+    """
+    Coherent state of a whole session as of the end of one frame.
+    """
+    _pack_ = 1
+    _fields_ = [
+        # PacketHeader
+        ('m_sessionUID', ctypes.c_ulonglong),
+        ('m_sessionTime', ctypes.c_float),
+        ('m_frameIdentifier', ctypes.c_uint),
+        ('m_playerCarIndex', ctypes.c_ubyte),
+        # PacketSessionData
+        ('m_weather', ctypes.c_ubyte),
+        ('m_trackTemperature', ctypes.c_byte),
+        ('m_airTemperature', ctypes.c_byte),
+        ('m_totalLaps', ctypes.c_ubyte),
+        ('m_trackLength', ctypes.c_ushort),
+        ('m_sessionType', ctypes.c_ubyte),
+        ('m_trackId', ctypes.c_byte),
+        ('m_sessionTimeLeft', ctypes.c_ushort),
+        ('m_safetyCarStatus', ctypes.c_ubyte),
+        # PacketParticipantsData
+        ('m_numCars', ctypes.c_ubyte),
+        ('m_cars', CarState * 20),
+    ]
+
+
+# Per packet id: the per-car array of the packet, if any
+CAR_ARRAYS = {
+    0: 'cars_motion_data',
+    2: 'm_lapData',
+    4: 'm_participants',
+    6: 'm_carTelemetryData',
+    7: 'cars_status_data',
+}
+
+
+def _common_fields(source, target):
+    names = {name for name, *_ in getattr(target, '_fields_', [])}
+    return [name for name, *_ in getattr(source, '_fields_', []) if name in names and name != 'm_header']
+
+
+def _car_type(packet_type, cars_field):
+    return {name: field_type for name, field_type, *_ in packet_type._fields_}[cars_field]._type_
+
+
+# Per packet id: (per-car array, per-car fields, session-level fields) copied into the snapshot
+MERGES = {
+    packet_id: (
+        CAR_ARRAYS.get(packet_id),
+        _common_fields(_car_type(packet_type, CAR_ARRAYS[packet_id]), CarState) if packet_id in CAR_ARRAYS else [],
+        _common_fields(packet_type, SessionSnapshot) if packet_id in (1, 4) else [],
+    )
+    for packet_id, packet_type in PACKET_TYPES.items()
+}
+
+
+class SessionState:
+    """
+    Incrementally updated state of one session. Every packet is merged in place, all cars at once
+    through NumPy views of the packet and of the state; when the first packet of a newer frame
+    arrives, the state of the completed frame is published as a SessionSnapshot.
+
+    Packets a few frames older than the current one arrived late: merging them would mix old values
+    into the frame being assembled, so they are counted and skipped. A bigger jump back is a restart
+    or a flashback, see packet_registry.frame_order: the cars start over from that frame, keeping
+    only the session-level fields.
+    """
+
+    def __init__(self, session_uid):
+        self.state = SessionSnapshot(m_sessionUID=session_uid)
+        self.cars = np.frombuffer(self.state, dtype=packet_dtype(SessionSnapshot), count=1)['m_cars'][0]
+        self.frame = None
+        self.snapshot = None  # Latest published snapshot
+        self.late = 0  # Packets skipped because their frame was already past
+
+    def apply(self, packet):
+        """Merges packet into the state and returns the snapshot it completed, if any."""
+        header = packet.m_header
+        packet_id = header.m_packetId
+        frame = header.m_frameIdentifier
+        completed = None
+        if self.frame is not None and frame != self.frame:
+            order = frame_order(self.frame, frame)
+            if order is LATE:
+                self.late += 1
+                return None
+            completed = self.snapshot = SessionSnapshot.from_buffer_copy(self.state)
+            if order is REWOUND:
+                self.cars[...] = 0
+
+        state = self.state
+        self.frame = state.m_frameIdentifier = frame
+        state.m_sessionTime = header.m_sessionTime
+        state.m_playerCarIndex = header.m_playerCarIndex
+
+        cars_field, car_fields, packet_fields = MERGES[packet_id]
+        if car_fields:
+            cars = np.frombuffer(packet, dtype=packet_dtype(type(packet)), count=1)[cars_field][0]
+            for name in car_fields:
+                self.cars[name] = cars[name]
+        for name in packet_fields:
+            setattr(state, name, getattr(packet, name))
+        return completed
+
+
+class SessionStateEngine:
+    """
+    Keeps a SessionState per m_sessionUID and calls every listener with each published snapshot.
+    Fed with decoded packets by apply(), or with raw datagrams as a stage of the live pipeline.
+    """
+
+    def __init__(self):
+        self.sessions = {}
+        self.listeners = []
+
+    def publish(self, data, spec):
+        if spec.packet_id in MERGES:
+            self.apply(spec.decode(data))
+
+    def apply(self, packet):
+        header = packet.m_header
+        if header.m_packetId not in MERGES:
+            return
+        session = self.sessions.get(header.m_sessionUID)
+        if session is None:
+            session = self.sessions[header.m_sessionUID] = SessionState(header.m_sessionUID)
+        snapshot = session.apply(packet)
+        if snapshot is not None:
+            for listener in self.listeners:
+                listener(snapshot)
+
+    def latest(self, session_uid):
+        session = self.sessions.get(session_uid)
+        return session.snapshot if session is not None else None
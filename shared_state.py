@@ -0,0 +1,225 @@
+import ctypes
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from f1_2019_struct import *
+
+DEFAULT_NAME = 'f1_2019'
+MAGIC = b'F12019SM'
+
+
+class RegionHeader(ctypes.LittleEndianStructure):
+    _pack_ = 1
+    _fields_ = [
+        ('m_magic', ctypes.c_char * 8),  # MAGIC
+        ('m_slots', ctypes.c_uint),  # Number of packet slots following the header
+        ('m_size', ctypes.c_uint),  # Size of the whole region in bytes
+        ('m_pid', ctypes.c_uint),  # Process id of the writer owning the region
+        ('m_padding', ctypes.c_uint),  # Keeps the slots 8-byte aligned
+    ]
+
+
+class SlotHeader(ctypes.LittleEndianStructure):
+    """
+    Seqlock guarding one packet slot: m_sequence is odd while the writer copies a packet in
+    and is incremented again when the copy is complete, so equal even values before and after
+    a read mean the read saw one whole packet.
+    """
+    _pack_ = 1
+    _fields_ = [
+        ('m_sequence', ctypes.c_ulonglong),  # Seqlock counter, 0 = never written
+        ('m_packetId', ctypes.c_ubyte),  # Packet id of the slot
+        ('m_reserved', ctypes.c_ubyte * 3),
+        ('m_capacity', ctypes.c_uint),  # Size of the packet struct the slot holds
+        ('m_length', ctypes.c_uint),  # Bytes copied in by the last write, m_capacity once written
+        ('m_padding', ctypes.c_uint),  # Keeps the packet 8-byte aligned
+    ]
+
+
+def _layout():
+    """Offset of the SlotHeader of every packet id; the packet follows its header."""
+    offsets = {}
+    offset = ctypes.sizeof(RegionHeader)
+    for packet_id, packet_type in sorted(PACKET_TYPES.items()):
+        offsets[packet_id] = offset
+        offset += ctypes.sizeof(SlotHeader) + (ctypes.sizeof(packet_type) + 7) // 8 * 8
+    return offsets, offset
+
+
+SLOT_OFFSETS, REGION_SIZE = _layout()
+
+
+def _remove_stale(name):
+    """
+    Unlinks the region name if it was left behind by a writer that is gone. Raises FileExistsError
+    if it belongs to a running writer or isn't a region of this module, rather than take it over.
+    """
+    shm = _attach(name)
+    owner = None
+    if shm.size >= ctypes.sizeof(RegionHeader):
+        region = RegionHeader.from_buffer(shm.buf)
+        if region.m_magic == MAGIC:
+            owner = region.m_pid
+        del region
+    shm.close()
+    if owner is None:
+        raise FileExistsError("shared memory {} exists and holds no F1 2019 state".format(name))
+    try:
+        os.kill(owner, 0)
+    except ProcessLookupError:
+        stale = shared_memory.SharedMemory(name)
+        stale.unlink()
+        stale.close()
+        return
+    except PermissionError:
+        pass  # running as another user
+    raise FileExistsError("shared memory {} is in use by the writer in process {}".format(name, owner))
+
+
+def _attach(name):
+    """Opens an existing region without handing it to the resource tracker, which would unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # Python < 3.13
+        pass
+    # registering and unregistering again would also drop the registration of a writer in this process
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedStateWriter:
+    """
+    Publishes the latest datagram of every packet type into a shared memory region, each one laid out
+    exactly as its f1_2019_struct struct, so local processes can read live telemetry with
+    SharedStateReader instead of a WebSocket. Has the publish(data, spec) interface of a hub or stage.
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=REGION_SIZE)
+        except FileExistsError:
+            # left over by a writer that didn't shut down cleanly
+            _remove_stale(name)
+            self.shm = shared_memory.SharedMemory(name, create=True, size=REGION_SIZE)
+        buf = self.shm.buf
+        self.slots = {}
+        for packet_id, offset in SLOT_OFFSETS.items():
+            capacity = ctypes.sizeof(PACKET_TYPES[packet_id])
+            header = SlotHeader.from_buffer(buf, offset)
+            header.m_packetId = packet_id
+            header.m_capacity = capacity
+            start = offset + ctypes.sizeof(SlotHeader)
+            self.slots[packet_id] = (header, start, capacity)
+        region = RegionHeader.from_buffer(buf)
+        region.m_slots = len(SLOT_OFFSETS)
+        region.m_size = REGION_SIZE
+        region.m_pid = os.getpid()
+        region.m_magic = MAGIC  # Last, so readers never see a half initialized region
+        del region
+
+    def publish(self, data, spec):
+        header, start, capacity = self.slots[spec.packet_id]
+        header.m_sequence += 1
+        # dispatched datagrams are at least capacity long; anything beyond the struct isn't kept
+        self.shm.buf[start:start + capacity] = memoryview(data)[:capacity]
+        header.m_length = capacity
+        header.m_sequence += 1
+
+    def close(self):
+        # the ctypes views export the buffer, which can't be released while they exist
+        self.slots = {}
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedStateReader:
+    """
+    Maps the region of a SharedStateWriter as ctypes packet structs.
+
+    view(packet_id) is the live struct in shared memory: reading it copies nothing, but the writer may
+    change it at any time; check sequence() before and after to know if the values belong together.
+    read(packet_id) copies the latest packet under the seqlock, a memmove retried in the rare case
+    it overlapped with a write, so the result is always one whole packet.
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = _attach(name)
+        buf = self.shm.buf
+        region = RegionHeader.from_buffer(buf)
+        if region.m_magic != MAGIC or region.m_size != REGION_SIZE:
+            del region
+            self.shm.close()
+            raise ValueError("shared memory {} has no compatible F1 2019 state".format(name))
+        del region
+        self.headers = {}
+        self.packets = {}
+        for packet_id, offset in SLOT_OFFSETS.items():
+            header = self.headers[packet_id] = SlotHeader.from_buffer(buf, offset)
+            if header.m_capacity != ctypes.sizeof(PACKET_TYPES[packet_id]):
+                self.close()
+                raise ValueError("packet {} layout of {} differs from f1_2019_struct".format(packet_id, name))
+            self.packets[packet_id] = PACKET_TYPES[packet_id].from_buffer(buf, offset + ctypes.sizeof(SlotHeader))
+
+    def sequence(self, packet_id):
+        """Seqlock counter of the slot: 0 if never written, odd while being written, +2 per packet."""
+        return self.headers[packet_id].m_sequence
+
+    def view(self, packet_id):
+        return self.packets[packet_id]
+
+    def read(self, packet_id, packet=None, spin=1000):
+        """
+        Consistent copy of the latest packet of packet_id, into packet when given; None if the type was
+        never published. Raises TimeoutError if spin attempts all overlapped with writes.
+        """
+        header = self.headers[packet_id]
+        source = self.packets[packet_id]
+        if packet is None:
+            packet = type(source)()
+        for _ in range(spin):
+            sequence = header.m_sequence
+            if sequence == 0:
+                return None
+            if not sequence & 1:
+                ctypes.memmove(ctypes.addressof(packet), ctypes.addressof(source), ctypes.sizeof(packet))
+                if header.m_sequence == sequence:
+                    return packet
+            # let a writer that was preempted mid-copy finish
+            time.sleep(0)
+        raise TimeoutError("packet {} kept changing while being read".format(packet_id))
+
+    def wait(self, packet_id, since=0, timeout=None, interval=0.0005):
+        """Polls until the sequence of packet_id passes since; returns the new sequence, or None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        header = self.headers[packet_id]
+        while True:
+            sequence = header.m_sequence
+            if sequence > since and not sequence & 1:
+                return sequence
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            time.sleep(interval)
+
+    def close(self):
+        self.headers = {}
+        self.packets = {}
+        self.shm.close()
+
+
+def main():
+    reader = SharedStateReader()
+    packet = PacketLapData()
+    sequence = 0
+    while True:
+        sequence = reader.wait(2, sequence)
+        reader.read(2, packet)
+        print("Distance Car 0: ", packet.m_lapData[0].m_totalDistance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import asyncio
+import ctypes
+import json
+import time
+
+import websockets
+
+from broadcast import Outbox, send_outbox
+from ctypes_json import CompiledJSONEncoder
+from field_paths import compile_field, parse_path, resolve_step
+from packet_registry import text_default
+
+from f1_2019_struct import PACKET_TYPES
+
+# Stream name used as the first element of a field path, per packet id
+STREAMS = {
+    'motion': 0,
+    'session': 1,
+    'lap': 2,
+    'event': 3,
+    'participants': 4,
+    'setups': 5,
+    'telemetry': 6,
+    'status': 7,
+}
+
+_to_json = CompiledJSONEncoder().default
+_extractors = {}
+
+
+def compile_path(path):
+    """
+    Compiles a field path such as 'lap.m_lapData[*].m_carPosition' into (packet id, extractor).
+    The extractor takes a decoded packet and its datagram and returns JSON-ready values; [*] selects
+    every element of an array. Paths are checked against _fields_ once, here, and the result is cached.
+    Paths selecting values or one flat list of values are read straight from the datagram by field_paths.
+    """
+    compiled = _extractors.get(path)
+    if compiled is not None:
+        return compiled
+
+    stream, *steps = parse_path(path)
+    if stream not in STREAMS:
+        raise ValueError("unknown stream '{}' in {}".format(stream, path))
+    if not steps or path[len(stream)] != '.':
+        raise ValueError("invalid field path {}".format(path))
+    packet_id = STREAMS[stream]
+
+    source = _step_source('packet', PACKET_TYPES[packet_id], steps, 0, path)
+    namespace = {'_to_json': _to_json}
+    try:
+        reader = compile_field(PACKET_TYPES[packet_id], path[len(stream) + 1:])
+    except ValueError:
+        reader = None
+    if reader is not None and reader.dimensions <= 1:
+        namespace['_read'] = reader
+        source = '_read(data)'
+    exec('def extract(packet, data):\n    return {}\n'.format(source), namespace)
+    compiled = _extractors[path] = (packet_id, namespace['extract'])
+    return compiled
+
+
+def _step_source(access, field_type, steps, depth, path):
+    for position, step in enumerate(steps):
+        item_type, _ = resolve_step(field_type, step, path)
+        if step == '*':
+            item = 'e{}'.format(depth)
+            item_source = _step_source(item, item_type, steps[position + 1:], depth + 1, path)
+            return '[{} for {} in {}]'.format(item_source, item, access)
+        access = '{}[{}]'.format(access, step) if step.isdigit() else '{}.{}'.format(access, step)
+        field_type = item_type
+
+    if issubclass(field_type, ctypes.Array) and field_type._type_ is ctypes.c_char:
+        # ctypes returns character arrays as bytes, cut at the first NUL
+        return "{}.decode('utf-8', 'replace')".format(access)
+    if issubclass(field_type, (ctypes.Structure, ctypes.Union, ctypes.Array)):
+        return '_to_json({})'.format(access)
+    return access
+
+
+def _encode(delta):
+    """
+    JSON of a delta message. A value that can't be encoded is replaced by an error for its path
+    alone, so the client keeps receiving every other path.
+    """
+    try:
+        return json.dumps(delta, default=text_default)
+    except (TypeError, ValueError):
+        pass
+    values = {}
+    for path, value in delta.items():
+        try:
+            json.dumps(value, default=text_default)
+        except (TypeError, ValueError) as error:
+            value = {'error': str(error)}
+        values[path] = value
+    return json.dumps(values, default=text_default)
+
+
+class Subscriber:
+    """
+    Field paths one client is subscribed to, grouped by packet id, and the last value sent for each.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        # one pending delta per stream plus errors, so nothing is ever dropped, only merged
+        self.outbox = Outbox(len(STREAMS) + 1)
+        self.paths = {}
+        self.last = {}
+
+    def subscribe(self, paths):
+        compiled = {}
+        for path in paths:
+            packet_id, extract = compile_path(path)
+            compiled.setdefault(packet_id, []).append((path, extract))
+        self.paths = compiled
+        self.last = {}
+
+
+class SubscriptionHub:
+    """
+    Serves clients that subscribe to field paths instead of whole packets.
+    Each packet is decoded once, each subscribed path is extracted once per packet, and every
+    client only receives the values that changed since its last message, as a JSON object keyed by path.
+    Deltas waiting for a slow client are merged per stream and only encoded when actually sent.
+
+    Clients subscribe by sending {"subscribe": ["lap.m_lapData[0].m_totalDistance", ...]};
+    a new subscription replaces the previous one.
+    """
+
+    def __init__(self, metrics=None):
+        self.subscribers = set()
+        self.metrics = metrics
+
+    def publish(self, data, spec):
+        if not self.subscribers:
+            return
+        metrics = self.metrics
+        stamp = time.perf_counter() if metrics is not None else None
+        packet = spec.decode(data)
+        if metrics is not None:
+            decoded = time.perf_counter()
+            metrics.observe('decode', decoded - stamp)
+        packet_id = spec.packet_id
+        values = {}
+
+        for subscriber in self.subscribers:
+            paths = subscriber.paths.get(packet_id)
+            if not paths:
+                continue
+            last = subscriber.last
+            delta = {}
+            for path, extract in paths:
+                value = values.get(path, values)
+                if value is values:
+                    value = values[path] = extract(packet, data)
+                if last.get(path, last) != value:
+                    delta[path] = last[path] = value
+            if delta:
+                subscriber.outbox.merge(packet_id, delta, stamp)
+
+        if metrics is not None:
+            metrics.observe('extract', time.perf_counter() - decoded)
+
+    async def handler(self, websocket, path=None):
+        subscriber = Subscriber(websocket)
+        self.subscribers.add(subscriber)
+        sender = asyncio.ensure_future(self._send(websocket, subscriber.outbox, self.metrics))
+        try:
+            async for message in websocket:
+                try:
+                    subscriber.subscribe(json.loads(message)['subscribe'])
+                except (ValueError, KeyError, TypeError) as error:
+                    subscriber.outbox.put('error', {'error': str(error)})
+        finally:
+            self.subscribers.discard(subscriber)
+            sender.cancel()
+
+    def stats(self):
+        """Outbox statistics per connected client."""
+        return [dict(subscriber.outbox.stats(), client=str(subscriber.websocket.remote_address))
+                for subscriber in list(self.subscribers)]
+
+    @staticmethod
+    async def _send(websocket, outbox, metrics):
+        try:
+            await send_outbox(websocket, outbox, _encode, metrics)
+        except websockets.ConnectionClosed:
+            pass
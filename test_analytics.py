@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from analytics import AnalyticsEngine, CAR_METRICS
+from lap_delta import ReferenceLaps
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+
+from f1_2019_struct import *
+
+
+def run(tyre_wear=None):
+    """Messages of two and a half synthetic laps; tyre_wear fixes the wear of every tyre."""
+    engine = AnalyticsEngine(references=ReferenceLaps())
+    messages = []
+    engine.listeners.append(lambda session: messages.append(session.message()))
+    for _, packet in synthetic_packets(5, 180, rate=10):
+        if tyre_wear is not None and isinstance(packet, PacketCarStatusData):
+            for car in packet.cars_status_data:
+                car.m_tyresWear[:] = [tyre_wear] * 4
+        data = bytes(packet)
+        engine.publish(data, REGISTRY.dispatch(data))
+    return messages
+
+
+def test_messages_are_strict_json():
+    messages = run()
+    assert messages
+    last = messages[-1]
+    assert last['m_sessionUID'] == 5
+    assert set(last['cars']) == set(CAR_METRICS.names)
+    assert all(len(values) == 20 for values in last['cars'].values())
+    assert last['cars']['fuel_per_lap'][0] == pytest.approx(1.8, abs=1e-3)
+    for message in messages:
+        json.dumps(message, allow_nan=False)
+
+
+def test_unworn_tyres_leave_laps_left_unknown():
+    messages = run(tyre_wear=10)
+    last = messages[-1]['cars']
+    assert last['tyre_wear_per_lap'][0] == 0
+    assert last['tyre_laps_left'] == [None] * 20
+    # fuel still runs out
+    assert last['fuel_laps_left'][0] is not None
+    for message in messages:
+        json.dumps(message, allow_nan=False)
+
+
+def test_sector_out_of_range():
+    engine = AnalyticsEngine(references=ReferenceLaps())
+    packets = synthetic_packets(5, 90, rate=10)
+    for _, packet in packets:
+        if isinstance(packet, PacketLapData) and packet.m_header.m_frameIdentifier % 7 == 0:
+            packet.m_lapData[3].m_sector = 200
+        data = bytes(packet)
+        engine.publish(data, REGISTRY.dispatch(data))
+    cars = engine.sessions[5].message()['cars']
+    assert set(cars['last_sector']) <= {0, 1, 2, None}
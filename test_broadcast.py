@@ -0,0 +1,86 @@
+import asyncio
+
+from broadcast import BroadcastHub, Outbox, TelemetryProtocol
+from metrics import Metrics
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+
+
+class Recorder:
+    def __init__(self):
+        self.packets = []
+
+    def publish(self, data, spec):
+        self.packets.append(spec.packet_id)
+
+
+class Failing:
+    def publish(self, data, spec):
+        raise ValueError(data)
+
+
+def test_failing_stage_is_isolated():
+    metrics = Metrics()
+    hub, stage = Recorder(), Recorder()
+    protocol = TelemetryProtocol(hub, metrics, [Failing(), stage])
+    for _, packet in synthetic_packets(1, 0.1):
+        protocol.datagram_received(bytes(packet), None)
+    assert len(hub.packets) == len(stage.packets) == 25
+    assert protocol.stage_errors == {'Failing': 25}
+    assert 'f1_stage_errors_total{stage="Failing"} 25' in metrics.render()
+    # rejected datagrams never reach a stage
+    protocol.datagram_received(b'\0' * 10, None)
+    assert protocol.stage_errors == {'Failing': 25}
+
+
+def drain(outbox):
+    async def get():
+        outbox.close()
+        messages = []
+        while True:
+            message = await outbox.get()
+            if message is None:
+                return messages
+            messages.append(message)
+    return asyncio.run(get())
+
+
+def test_outbox_conflates_per_key():
+    outbox = Outbox(size=4)
+    for frame in range(3):
+        outbox.put('lap', 'lap {}'.format(frame))
+        outbox.put('telemetry', 'telemetry {}'.format(frame))
+    outbox.merge('state', {'a': 1})
+    outbox.merge('state', {'b': 2})
+    assert outbox.stats() == {'pending': 3, 'sent': 0, 'conflated': 5, 'dropped': 0}
+    assert drain(outbox) == ['lap 2', 'telemetry 2', {'a': 1, 'b': 2}]
+    assert outbox.stats()['sent'] == 3
+
+
+def test_outbox_drops_the_oldest_key():
+    outbox = Outbox(size=2)
+    for key in range(5):
+        outbox.put(key, key)
+    assert outbox.stats() == {'pending': 2, 'sent': 0, 'conflated': 0, 'dropped': 3}
+    assert drain(outbox) == [3, 4]
+
+
+def test_hub_encodes_once():
+    encoded = []
+
+    def encode(packet):
+        encoded.append(packet)
+        return 'frame {}'.format(packet.m_header.m_frameIdentifier)
+
+    hub = BroadcastHub(encode, REGISTRY.decode)
+    outboxes = [hub.subscribe(client) for client in ('a', 'b', 'c')]
+    binary = hub.subscribe('d', binary=True)
+    stream = [bytes(packet) for _, packet in synthetic_packets(1, 0.1)]
+    for data in stream:
+        hub.publish(data, REGISTRY.dispatch(data))
+    assert len(encoded) == len(stream)
+    for outbox in outboxes:
+        assert outbox.pending[2] == 'frame 5'
+    assert binary.pending[2] == [data for data in stream if REGISTRY.dispatch(data).packet_id == 2][-1]
+    hub.unsubscribe('a')
+    assert len(hub.subscribers) == 2
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from capture import CaptureReader, CaptureWriter, index_path
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+
+from f1_2019_struct import *
+
+
+def capture(path, session_uid=1, duration=1.0):
+    datagrams = [bytes(packet) for _, packet in synthetic_packets(session_uid, duration)]
+    with CaptureWriter(path) as writer:
+        for data in datagrams:
+            writer.publish(data, REGISTRY.dispatch(data))
+    return datagrams
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'session.f1cap')
+    datagrams = capture(path)
+    with CaptureReader(path) as reader:
+        assert isinstance(reader.entries, np.memmap)
+        assert len(reader.entries) == len(datagrams)
+        assert [bytes(reader.datagram(entry)) for entry in reader.entries] == datagrams
+        laps = reader.select(packet_id=2, frames=(10, 20))
+        assert laps['m_frameIdentifier'].tolist() == list(range(10, 20))
+        frames = [packet.m_header.m_frameIdentifier for packet in reader.packets(PacketLapData, laps)]
+        assert frames == list(range(10, 20))
+        # the player's lap is known from the first lap data packet on
+        assert len(reader.select(lap=0)) == 1
+        assert len(reader.select(lap=1)) == len(datagrams) - 1
+        assert len(reader.select(session_uid=2)) == 0
+
+
+def test_record_skips_rejected_datagrams(tmp_path):
+    path = str(tmp_path / 'session.f1cap')
+    data = bytes(next(synthetic_packets(1, 1))[1])
+    with CaptureWriter(path) as writer:
+        writer.record(data)
+        writer.record(data[:10])
+        writer.record(b'\0' * len(data))
+    with CaptureReader(path) as reader:
+        assert len(reader.entries) == 1
+
+
+def test_spectating(tmp_path):
+    path = str(tmp_path / 'session.f1cap')
+    packet = PacketLapData()
+    packet.m_header.m_packetFormat = 2019
+    packet.m_header.m_packetId = 2
+    packet.m_header.m_playerCarIndex = 255
+    data = bytes(packet)
+    with CaptureWriter(path) as writer:
+        writer.record(data)
+    with CaptureReader(path) as reader:
+        assert reader.entries['m_lapNum'].tolist() == [0]
+
+
+def test_interrupted_recording(tmp_path):
+    path = str(tmp_path / 'session.f1cap')
+    datagrams = capture(path, duration=0.1)
+    # the last datagram never made it to disk, and neither did part of the last index entry
+    size = len(open(path, 'rb').read())
+    with open(path, 'r+b') as file:
+        file.truncate(size - len(datagrams[-1]) // 2)
+    with open(index_path(path), 'ab') as file:
+        file.write(b'\0' * 5)
+    with CaptureReader(path) as reader:
+        assert len(reader.entries) == len(datagrams) - 1
+
+
+def test_empty_and_foreign_files(tmp_path):
+    path = str(tmp_path / 'empty.f1cap')
+    CaptureWriter(path).close()
+    with CaptureReader(path) as reader:
+        assert len(reader.select(packet_id=2)) == 0
+    foreign = tmp_path / 'foreign.f1cap'
+    foreign.write_bytes(b'not a capture')
+    with pytest.raises(ValueError):
+        CaptureReader(str(foreign))
@@ -0,0 +1,56 @@
+from broadcast import BroadcastHub
+from capture import CaptureWriter
+from compression import (DICTIONARY_SIZE, DictionaryCompressor, capture_samples, decompress, synthetic_samples,
+                         train_dictionary)
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+
+
+def messages(session_uid=3, duration=0.2):
+    return [REGISTRY.encode(packet) for _, packet in synthetic_packets(session_uid, duration)]
+
+
+def test_dictionary():
+    dictionary = train_dictionary(synthetic_samples())
+    assert 0 < len(dictionary) <= DICTIONARY_SIZE
+    assert train_dictionary({}) == b''
+
+
+def test_round_trip_and_ratio():
+    dictionary = train_dictionary(synthetic_samples())
+    compressor = DictionaryCompressor(dictionary)
+    plain = DictionaryCompressor(b'')
+    for message in messages():
+        compressed = compressor.compress(message)
+        assert decompress(compressed, dictionary).decode() == message
+        # each message stands alone and the dictionary pays off on every one
+        assert len(compressed) <= len(plain.compress(message))
+    assert compressor.compress(b'{}') == compressor.compress('{}')
+
+
+def test_capture_samples(tmp_path):
+    path = str(tmp_path / 'session.f1cap')
+    with CaptureWriter(path) as writer:
+        for _, packet in synthetic_packets(1, 1.0):
+            writer.record(bytes(packet))
+    samples = capture_samples(path, per_type=4)
+    assert sorted(samples) == [0, 1, 2, 6, 7]
+    assert all(len(encoded) == 4 for packet_id, encoded in samples.items() if packet_id != 1)
+
+
+def test_hub_compresses_once():
+    dictionary = train_dictionary(synthetic_samples())
+    compressor = DictionaryCompressor(dictionary)
+    calls = []
+    compress = compressor.compress
+    compressor.compress = lambda message: calls.append(message) or compress(message)
+    hub = BroadcastHub(REGISTRY.encode, REGISTRY.decode, compressor=compressor)
+    compressed = [hub.subscribe(client) for client in ('a', 'b')]
+    for outbox in compressed:
+        outbox.compressed = True
+    plain = hub.subscribe('c')
+    data = bytes(next(synthetic_packets(1, 1))[1])
+    hub.publish(data, REGISTRY.dispatch(data))
+    assert len(calls) == 1
+    assert compressed[0].pending[0] is compressed[1].pending[0]
+    assert decompress(compressed[0].pending[0], dictionary).decode() == plain.pending[0]
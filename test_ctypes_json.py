@@ -0,0 +1,36 @@
+import ctypes
+import json
+import random
+
+from ctypes_json import CDataJSONEncoder, compile_encoder
+
+from f1_2019_struct import *
+
+
+def random_packet(packet_type, seed):
+    generator = random.Random(seed)
+    data = bytes(generator.getrandbits(8) for _ in range(ctypes.sizeof(packet_type)))
+    return packet_type.from_buffer_copy(data)
+
+
+def has_text(field_type):
+    if issubclass(field_type, ctypes.Array):
+        return field_type._type_ is ctypes.c_char or has_text(field_type._type_)
+    if issubclass(field_type, (ctypes.Structure, ctypes.Union)):
+        return any(has_text(item_type) for _, item_type, *_ in field_type._fields_)
+    return False
+
+
+def test_compiled_encoder_matches_recursive_encoder():
+    # the recursive encoder can't encode the bytes of character arrays, so those are left out
+    packet_types = [packet_type for packet_type in PACKET_TYPES.values() if not has_text(packet_type)]
+    for packet_type in packet_types:
+        for seed in range(3):
+            packet = random_packet(packet_type, seed)
+            expected = json.dumps(packet, cls=CDataJSONEncoder)
+            assert json.dumps(compile_encoder(packet_type)(packet)) == expected
+
+
+def test_compiled_encoder_is_cached():
+    assert compile_encoder(PacketLapData) is compile_encoder(PacketLapData)
+
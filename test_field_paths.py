@@ -0,0 +1,55 @@
+import pytest
+
+from field_paths import compile_field, parse_path
+from test_ctypes_json import random_packet
+
+from f1_2019_struct import *
+
+
+def test_single_values():
+    packet = random_packet(PacketLapData, 1)
+    data = bytes(packet)
+    assert compile_field(PacketLapData, 'm_header.m_frameIdentifier')(data) == packet.m_header.m_frameIdentifier
+    assert compile_field(PacketLapData, 'm_lapData[3].m_carPosition')(data) == packet.m_lapData[3].m_carPosition
+    assert compile_field(PacketLapData, 'm_lapData[19].m_totalDistance')(data) == pytest.approx(
+        packet.m_lapData[19].m_totalDistance, nan_ok=True)
+
+
+def test_wildcards_and_arrays():
+    packet = random_packet(PacketCarTelemetryData, 2)
+    data = bytes(packet)
+    speeds = compile_field(PacketCarTelemetryData, 'm_carTelemetryData[*].m_speed')
+    assert speeds(data) == tuple(car.m_speed for car in packet.m_carTelemetryData)
+    assert speeds.dimensions == 1
+    wear = compile_field(PacketCarStatusData, 'cars_status_data[*].m_tyresWear')
+    assert wear.dimensions == 2
+    assert len(wear(bytes(random_packet(PacketCarStatusData, 3)))) == 20 * 4
+
+
+def test_offset_into_buffer():
+    data = bytes(random_packet(PacketLapData, 4))
+    read = compile_field(PacketLapData, 'm_lapData[0].m_lapDistance')
+    assert read(b'\0' * 7 + data, 7) == read(data)
+
+
+def test_text():
+    packet = PacketParticipantsData()
+    packet.m_participants[2].m_name = 'Räikkönen'.encode('utf-8')
+    name = compile_field(PacketParticipantsData, 'm_participants[2].m_name')
+    assert name(bytes(packet)) == 'Räikkönen'
+
+
+@pytest.mark.parametrize('path', [
+    'm_lapData[0]m_carPosition',  # steps must be separated by dots
+    'm_lapData[20].m_carPosition',
+    'm_lapData.m_carPosition',
+    'm_lapData[0].m_unknown',
+    'm_lapData[0]',  # a struct, not a value
+])
+def test_invalid_paths(path):
+    with pytest.raises(ValueError):
+        compile_field(PacketLapData, path)
+
+
+def test_parse_path():
+    assert parse_path('m_lapData[*].m_carPosition') == ['m_lapData', '*', 'm_carPosition']
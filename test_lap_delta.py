@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from analytics import AnalyticsEngine
+from lap_delta import LapDeltaIndex, ReferenceLaps, interpolate
+from numpy_structs import packet_dtype
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+
+from f1_2019_struct import *
+
+
+def test_interpolate_matches_numpy():
+    distance = np.array([0.0, 10.0, 25.0, 40.0])
+    time = np.array([0.0, 1.0, 2.0, 4.0])
+    at = np.array([0.0, 5.0, 10.0, 30.0, 39.9])
+    assert interpolate(distance, time, at) == pytest.approx(np.interp(at, distance, time))
+
+
+def test_reference_laps_keep_the_fastest(tmp_path):
+    references = ReferenceLaps(str(tmp_path))
+    lap = np.array([0.0, 100.0]), np.array([0.0, 2.0])
+    assert references.offer(3, *lap, 80.0)
+    assert not references.offer(3, *lap, 81.0)
+    assert references.offer(3, *lap, 79.0)
+    # stored laps outlive the process
+    stored = ReferenceLaps(str(tmp_path)).get(3)
+    assert stored[2] == 79.0
+    assert ReferenceLaps(str(tmp_path)).get(4) is None
+
+
+def laps(track_id=5, duration=160):
+    """m_lapData views of synthetic lap packets, cars doing about 71 s laps, after a session packet."""
+    for _, packet in synthetic_packets(1, duration, rate=10):
+        if isinstance(packet, PacketSessionData):
+            packet.m_trackId = track_id
+        yield packet, np.frombuffer(bytes(packet), dtype=packet_dtype(type(packet)), count=1)[0]
+
+
+def test_delta_to_best():
+    index = LapDeltaIndex(ReferenceLaps())
+    index.set_track(5)
+    for packet, record in laps():
+        if isinstance(packet, PacketLapData):
+            index.update(record['m_lapData'])
+    # every synthetic lap is driven at the same pace
+    assert index.best[0] is not None
+    assert np.nanmax(np.abs(index.delta_to_best())) < 0.2
+    assert np.nanmax(np.abs(index.delta_to_reference())) < 0.2
+    assert index.references.get(5) is not None
+
+
+def test_unknown_track_has_no_reference():
+    references = ReferenceLaps()
+    engine = AnalyticsEngine(references=references)
+    for packet, _ in laps(track_id=-1):
+        data = bytes(packet)
+        engine.publish(data, REGISTRY.dispatch(data))
+    assert engine.sessions[1].deltas.track_id is None
+    assert references.laps == {}
+    assert engine.sessions[1].message()['cars']['delta_to_reference'] == [None] * 20
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+from broadcast import send_outbox
+from metrics import FrameTracker, Histogram, Metrics
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+from subscriptions import Subscriber, SubscriptionHub, _encode
+
+
+def track(frames, packet_id=2):
+    tracker = FrameTracker()
+    for frame in frames:
+        tracker.update(1, packet_id, frame)
+    return tracker
+
+
+def test_in_order():
+    tracker = track(range(100))
+    assert (tracker.received, tracker.lost, tracker.reordered, tracker.duplicates) == (100, 0, 0, 0)
+    assert tracker.loss() == 0.0
+
+
+def test_gaps_and_reordering():
+    # 2 and 3 go missing, then 3 turns up late
+    tracker = track([0, 1, 4, 5, 3, 6])
+    assert (tracker.received, tracker.lost, tracker.reordered) == (6, 1, 1)
+    assert tracker.loss() == 1 / 7
+
+
+def test_duplicates_are_not_credited():
+    # 2 and 3 were lost; 1 and 4 arrive twice, 0 arrives again after the gap
+    tracker = track([0, 1, 1, 4, 4, 0])
+    assert (tracker.received, tracker.lost, tracker.reordered, tracker.duplicates) == (3, 2, 0, 3)
+
+
+def test_flashback_is_not_reordering():
+    tracker = track(list(range(1000)) + list(range(700, 1000)))
+    assert (tracker.lost, tracker.reordered, tracker.duplicates) == (0, 0, 0)
+    assert tracker.received == 1300
+    assert tracker.loss() == 0.0
+
+
+def test_untracked_packets_and_sessions():
+    tracker = FrameTracker()
+    tracker.update(1, 1, 0)
+    tracker.update(1, 1, 50)
+    tracker.update(1, 2, 0)
+    tracker.update(2, 2, 50)
+    assert (tracker.received, tracker.lost) == (2, 0)
+
+
+def test_histogram_buckets():
+    histogram = Histogram([0.001, 0.01])
+    for value in (0.0005, 0.001, 0.005, 1.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+
+
+def test_render():
+    metrics = Metrics()
+    for _, packet in synthetic_packets(1, 0.5):
+        data = bytes(packet)
+        metrics.received(data, REGISTRY.dispatch(data))
+    metrics.observe('decode', 0.00002)
+    text = metrics.render()
+    assert 'f1_packets_received_total{packet="PacketLapData"} 30' in text
+    assert 'f1_packets_lost_total 0' in text
+    assert 'f1_stage_seconds_count{stage="decode"} 1' in text
+
+
+class Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+def test_subscription_stages():
+    metrics = Metrics()
+    hub = SubscriptionHub(metrics)
+    subscriber = Subscriber(Socket())
+    subscriber.subscribe(['lap.m_lapData[0].m_totalDistance'])
+    hub.subscribers.add(subscriber)
+    published = 0
+    for _, packet in synthetic_packets(1, 0.1):
+        data = bytes(packet)
+        hub.publish(data, REGISTRY.dispatch(data))
+        published += 1
+    # paths are extracted per packet, deltas are only encoded when sent
+    assert metrics.histograms['extract'].count == published
+    assert metrics.histograms['encode'].count == 0
+
+    async def send():
+        subscriber.outbox.close()
+        await send_outbox(subscriber.websocket, subscriber.outbox, _encode, metrics)
+
+    asyncio.run(send())
+    [message] = subscriber.websocket.sent
+    assert json.loads(message)['lap.m_lapData[0].m_totalDistance'] > 0
+    assert metrics.histograms['encode'].count == 1
+    assert metrics.histograms['send'].count == 1
@@ -0,0 +1,39 @@
+import ctypes
+
+import numpy as np
+
+from numpy_structs import decode_batch, packet_dtype
+from test_ctypes_json import random_packet
+
+from f1_2019_struct import *
+
+
+def test_layouts_match_ctypes():
+    for packet_type in PACKET_TYPES.values():
+        dtype = packet_dtype(packet_type)
+        assert dtype.itemsize == ctypes.sizeof(packet_type)
+        for name, *_ in packet_type._fields_:
+            assert dtype.fields[name][1] == getattr(packet_type, name).offset
+
+
+def test_values_match_ctypes():
+    packet = random_packet(PacketCarTelemetryData, 1)
+    record = np.frombuffer(bytes(packet), dtype=packet_dtype(PacketCarTelemetryData), count=1)[0]
+    assert record['m_header']['m_frameIdentifier'] == packet.m_header.m_frameIdentifier
+    cars = record['m_carTelemetryData']
+    assert cars['m_speed'].tolist() == [car.m_speed for car in packet.m_carTelemetryData]
+    assert cars['m_brakesTemperature'][7].tolist() == list(packet.m_carTelemetryData[7].m_brakesTemperature)
+
+    names = PacketParticipantsData()
+    names.m_participants[1].m_name = b'ALBON'
+    record = np.frombuffer(bytes(names), dtype=packet_dtype(PacketParticipantsData), count=1)[0]
+    assert record['m_participants']['m_name'][1] == b'ALBON'
+
+
+def test_decode_batch():
+    packets = [random_packet(PacketLapData, seed) for seed in range(5)]
+    data = b''.join(bytes(packet) for packet in packets)
+    batch = decode_batch(PacketLapData, data)
+    assert batch.shape == (5,)
+    assert batch['m_lapData']['m_carPosition'][:, 3].tolist() == [packet.m_lapData[3].m_carPosition for packet in packets]
+    assert decode_batch(PacketLapData, data, count=2, offset=len(data) // 5).shape == (2,)
@@ -0,0 +1,85 @@
+import ctypes
+import json
+
+from packet_registry import HEADER_SIZE, LATE, PacketRegistry, REGISTRY, REWOUND, frame_order
+
+from f1_2019_struct import *
+
+
+def packet(packet_type, packet_id, packet_format=2019):
+    packet = packet_type()
+    packet.m_header.m_packetFormat = packet_format
+    packet.m_header.m_packetId = packet_id
+    packet.m_header.m_sessionUID = 42
+    packet.m_header.m_sessionTime = 1.5
+    packet.m_header.m_frameIdentifier = 90
+    return bytes(packet)
+
+
+def registry():
+    registry = PacketRegistry()
+    for packet_id, packet_type in PACKET_TYPES.items():
+        registry.register(2019, packet_id, packet_type)
+    return registry
+
+
+def test_dispatch_valid():
+    registry_ = registry()
+    for packet_id, packet_type in PACKET_TYPES.items():
+        spec = registry_.dispatch(packet(packet_type, packet_id))
+        assert spec.packet_id == packet_id
+        assert spec.packet_type is packet_type
+        assert spec.size == ctypes.sizeof(packet_type)
+    assert (registry_.malformed, registry_.unknown) == (0, 0)
+
+
+def test_dispatch_short():
+    registry_ = registry()
+    data = packet(PacketLapData, 2)
+    assert registry_.dispatch(b'') is None
+    assert registry_.dispatch(data[:HEADER_SIZE - 1]) is None
+    # a complete header, but less than the struct it announces
+    assert registry_.dispatch(data[:HEADER_SIZE]) is None
+    assert registry_.dispatch(data[:-1]) is None
+    assert (registry_.malformed, registry_.unknown) == (4, 0)
+
+
+def test_dispatch_unknown():
+    registry_ = registry()
+    assert registry_.dispatch(packet(PacketLapData, 2, packet_format=2018)) is None
+    assert registry_.dispatch(packet(PacketLapData, 8)) is None
+    assert registry_.dispatch(packet(PacketLapData, 255)) is None
+    assert (registry_.malformed, registry_.unknown) == (0, 3)
+
+
+def test_dispatch_longer_datagram():
+    spec = REGISTRY.dispatch(packet(PacketEventData, 3) + b'\0' * 8)
+    assert spec.packet_type is PacketEventData
+
+
+def test_decode_and_session():
+    data = packet(PacketCarTelemetryData, 6)
+    decoded = REGISTRY.decode(data)
+    assert isinstance(decoded, PacketCarTelemetryData)
+    assert bytes(decoded) == data
+    assert REGISTRY.decode(data[:10]) is None
+    assert REGISTRY.session(data) == (42, 1.5, 90)
+
+
+def test_encodes_text():
+    packet = PacketParticipantsData()
+    packet.m_numCars = 1
+    packet.m_participants[0].m_name = b'HAMILTON'
+    message = json.loads(REGISTRY.encode(packet))
+    assert message['m_participants'][0]['m_name'] == 'HAMILTON'
+    assert message['m_participants'][1]['m_name'] == ''
+
+
+def test_frame_order():
+    assert frame_order(None, 5) is None
+    assert frame_order(100, 100) is None
+    assert frame_order(100, 101) is None
+    assert frame_order(100, 90) is LATE
+    assert frame_order(100, 89) is REWOUND
+    assert frame_order(999, 700) is REWOUND
+    assert frame_order(100, 99, late_frames=0) is REWOUND
@@ -0,0 +1,27 @@
+import ctypes
+import socket
+
+from packet_ring import PacketRing
+from replay import synthetic_packets
+
+from f1_2019_struct import *
+
+
+def test_recv_into():
+    receiver, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    with receiver, sender:
+        ring = PacketRing(slots=4)
+        received = []
+        for _, packet in synthetic_packets(1, 0.05):
+            sender.send(bytes(packet))
+            decoded = ring.recv_into(receiver)
+            assert type(decoded) is type(packet)
+            assert bytes(decoded) == bytes(packet)
+            received.append(decoded)
+        # packets are views of the slots, valid until the ring wraps around
+        assert ctypes.addressof(received[0]) == ctypes.addressof(received[4])
+
+        sender.send(b'\0' * 10)
+        assert ring.recv_into(receiver) is None
+        sender.send(bytes(PacketLapData()))  # packet format 0
+        assert ring.recv_into(receiver) is None
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pytest
+
+from numpy_structs import packet_dtype
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+from resample import IntervalAggregator, ResamplingHub, parse_rates
+
+from f1_2019_struct import *
+
+
+def telemetry(duration=1.0):
+    return [bytes(packet) for _, packet in synthetic_packets(1, duration) if isinstance(packet, PacketCarTelemetryData)]
+
+
+def test_parse_rates():
+    assert parse_rates('/?rate=10') == {0: 10.0, 6: 10.0}
+    assert parse_rates('/?rate=10&telemetry=20') == {0: 10.0, 6: 20.0}
+    assert parse_rates('/?motion=60&telemetry=abc&speed=5') == {}
+    assert parse_rates(None) == {}
+
+
+def test_interval_aggregates():
+    aggregator = IntervalAggregator(6, 0.1)
+    stream = telemetry()
+    messages = [message for message in map(aggregator.add, stream) if message is not None]
+    # one message per completed interval, even where rounding puts a packet just short of a boundary
+    starts = [message['m_sessionTime'] for message in messages]
+    assert starts == pytest.approx([interval / 10 for interval in range(9)])
+    first = messages[0]
+    assert first['samples'] == 6 and first['m_sessionTime'] == 0.0
+    speeds = np.stack([
+        np.frombuffer(data, dtype=packet_dtype(PacketCarTelemetryData), count=1)[0]['m_carTelemetryData']['m_speed']
+        for data in stream[:6]
+    ])
+    aggregates = first['aggregates']
+    assert aggregates['mean']['m_speed'] == pytest.approx(speeds.mean(axis=0).tolist())
+    assert aggregates['min']['m_speed'] == speeds.min(axis=0).tolist()
+    assert aggregates['max']['m_speed'] == speeds.max(axis=0).tolist()
+    assert aggregates['last']['m_speed'] == speeds[-1].tolist()
+    assert len(aggregates['mean']['m_brakesTemperature'][0]) == 4
+
+
+def test_restart_starts_a_new_interval():
+    aggregator = IntervalAggregator(6, 0.1)
+    for data in telemetry(0.5):
+        aggregator.add(data)
+    for data in telemetry(0.05):
+        assert aggregator.add(data) is None
+    assert aggregator.start == 0.0 and aggregator.count == 3
+
+
+def test_hub_resamples_per_client():
+    hub = ResamplingHub(lambda packet: 'packet', REGISTRY.decode)
+    hub.rates['slow'] = {6: 10.0}
+    slow, fast = hub.subscribe('slow'), hub.subscribe('fast')
+    hub.rates['other'] = {6: 10.0}
+    other = hub.subscribe('other')
+    assert len(hub.groups[6]) == 1
+    for _, packet in synthetic_packets(1, 0.25):
+        data = bytes(packet)
+        hub.publish(data, REGISTRY.dispatch(data))
+    assert fast.pending[6] == 'packet'
+    assert json.loads(slow.pending[6])['samples'] == 6
+    assert other.pending[6] == slow.pending[6]
+    # motion is not resampled for these clients
+    assert slow.pending[0] == 'packet'
+    hub.unsubscribe('slow')
+    hub.unsubscribe('other')
+    assert hub.groups[6] == {}
+    assert list(hub.receivers(6)) == [fast]
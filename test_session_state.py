@@ -0,0 +1,52 @@
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+from session_state import SessionStateEngine
+
+
+def datagrams(session_uid=1, frames=1000):
+    return [bytes(packet) for _, packet in synthetic_packets(session_uid, frames / 60)]
+
+
+def frame(data):
+    return REGISTRY.session(data)[2]
+
+
+def run(engine, stream):
+    snapshots = []
+    engine.listeners.append(snapshots.append)
+    for data in stream:
+        engine.publish(data, REGISTRY.dispatch(data))
+    engine.listeners.remove(snapshots.append)
+    return snapshots
+
+
+def test_publishes_every_frame():
+    engine = SessionStateEngine()
+    snapshots = run(engine, datagrams(frames=100))
+    assert [snapshot.m_frameIdentifier for snapshot in snapshots] == list(range(99))
+    last = snapshots[-1]
+    assert last.m_trackLength == 5000
+    assert last.m_cars[0].m_speed > 0
+    assert engine.latest(1) is last
+
+
+def test_skips_late_packets():
+    stream = datagrams(frames=100)
+    late = [data for data in stream if frame(data) == 95]
+    engine = SessionStateEngine()
+    snapshots = run(engine, stream + late)
+    assert engine.sessions[1].late == len(late)
+    assert snapshots[-1].m_frameIdentifier == 98
+
+
+def test_flashback_starts_over():
+    stream = datagrams()
+    engine = SessionStateEngine()
+    run(engine, stream)
+    # a flashback replays frames 700-999
+    replayed = run(engine, [data for data in stream if frame(data) >= 700])
+    assert engine.sessions[1].late == 0
+    assert [snapshot.m_frameIdentifier for snapshot in replayed] == [999] + list(range(700, 999))
+    # session-level fields survive, the cars are merged again from the new frame
+    assert replayed[-1].m_trackLength == 5000
+    assert replayed[-1].m_cars[19].m_speed > 0
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+from shared_state import SharedStateReader, SharedStateWriter
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def name():
+    return 'f1test_{}'.format(uuid.uuid4().hex[:12])
+
+
+def publish(writer, duration=0.1):
+    for _, packet in synthetic_packets(1, duration):
+        data = bytes(packet)
+        writer.publish(data, REGISTRY.dispatch(data))
+
+
+def run(code):
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+
+
+def test_latest_packets(name):
+    writer = SharedStateWriter(name)
+    try:
+        reader = SharedStateReader(name)
+        assert reader.sequence(2) == 0
+        assert reader.read(2) is None
+        publish(writer)
+        assert reader.sequence(2) == 2 * 6
+        lap = reader.read(2)
+        assert lap.m_header.m_frameIdentifier == 5
+        assert reader.view(2).m_lapData[0].m_totalDistance == lap.m_lapData[0].m_totalDistance
+        assert reader.wait(2, since=reader.sequence(2), timeout=0.01) is None
+        assert reader.wait(2, since=0) == reader.sequence(2)
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_refuses_a_running_writer(name):
+    writer = SharedStateWriter(name)
+    try:
+        with pytest.raises(FileExistsError):
+            SharedStateWriter(name)
+        result = run("from shared_state import SharedStateWriter\nSharedStateWriter({!r})".format(name))
+        assert 'FileExistsError' in result.stderr
+        publish(writer)
+        reader = SharedStateReader(name)
+        assert reader.read(6) is not None
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_replaces_a_stale_region(name):
+    # a writer that died without closing; its resource tracker is killed along with it
+    code = (
+        "import os, signal\n"
+        "from multiprocessing import resource_tracker\n"
+        "from shared_state import SharedStateWriter\n"
+        "SharedStateWriter({!r})\n"
+        "os.kill(resource_tracker._resource_tracker._pid, signal.SIGKILL)\n"
+        "os._exit(0)\n"
+    ).format(name)
+    assert run(code).returncode == 0
+    writer = SharedStateWriter(name)
+    try:
+        publish(writer)
+        reader = SharedStateReader(name)
+        assert reader.read(0).m_header.m_sessionUID == 1
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_reader_needs_a_writer(name):
+    with pytest.raises(FileNotFoundError):
+        SharedStateReader(name)
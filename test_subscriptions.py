@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from packet_registry import REGISTRY
+from subscriptions import Subscriber, SubscriptionHub, _encode, compile_path
+
+from f1_2019_struct import *
+
+
+def participants():
+    packet = PacketParticipantsData()
+    packet.m_header.m_packetFormat = 2019
+    packet.m_header.m_packetId = 4
+    packet.m_numCars = 2
+    packet.m_participants[0].m_name = b'VETTEL'
+    packet.m_participants[1].m_name = b'LECLERC'
+    return packet
+
+
+def extract(path, packet):
+    packet_id, extractor = compile_path(path)
+    assert packet_id == packet.m_header.m_packetId
+    return extractor(packet, bytes(packet))
+
+
+def test_text_paths():
+    packet = participants()
+    assert extract('participants.m_participants[1].m_name', packet) == 'LECLERC'
+    assert list(extract('participants.m_participants[*].m_name', packet))[:3] == ['VETTEL', 'LECLERC', '']
+    # structs holding text go through the compiled encoder
+    assert json.loads(_encode({'p': extract('participants.m_participants[0]', packet)}))['p']['m_name'] == 'VETTEL'
+
+
+@pytest.mark.parametrize('path', ['participants', 'participantsm_numCars', 'pits.m_header', 'lap.m_lapData[0]m_carPosition'])
+def test_invalid_paths(path):
+    with pytest.raises(ValueError):
+        compile_path(path)
+
+
+def test_encode_isolates_errors():
+    message = json.loads(_encode({'a': 1, 'b': object(), 'c': b'text'}))
+    assert message['a'] == 1
+    assert 'error' in message['b']
+    assert message['c'] == 'text'
+
+
+def test_hub_sends_changed_values():
+    hub = SubscriptionHub()
+    subscriber = Subscriber(None)
+    subscriber.subscribe(['participants.m_participants[0].m_name', 'participants.m_numCars'])
+    hub.subscribers.add(subscriber)
+
+    data = bytes(participants())
+    hub.publish(data, REGISTRY.dispatch(data))
+    delta = subscriber.outbox.pending.pop(4)
+    assert json.loads(_encode(delta)) == {
+        'participants.m_participants[0].m_name': 'VETTEL',
+        'participants.m_numCars': 2,
+    }
+
+    packet = participants()
+    packet.m_numCars = 3
+    data = bytes(packet)
+    hub.publish(data, REGISTRY.dispatch(data))
+    assert subscriber.outbox.pending[4] == {'participants.m_numCars': 3}
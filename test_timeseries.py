@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from packet_registry import REGISTRY
+from replay import synthetic_packets
+from timeseries import TimeSeriesStore
+
+
+def datagrams(session_uid=1, duration=3.0):
+    return [bytes(packet) for _, packet in synthetic_packets(session_uid, duration)]
+
+
+def feed(store, stream):
+    for data in stream:
+        store.publish(data, REGISTRY.dispatch(data))
+
+
+def frame(data):
+    return REGISTRY.session(data)[2]
+
+
+def test_window():
+    store = TimeSeriesStore(seconds=2)
+    feed(store, datagrams())
+    times, speeds = store.window('m_speed', 1.0, 1.5)
+    assert len(times) == 30
+    assert times[0] == pytest.approx(1.0) and times[-1] == pytest.approx(89 / 60)
+    assert speeds.shape == (30, 20)
+    # the ring wrapped: only the last two seconds are kept, oldest first
+    times, _ = store.window('m_speed')
+    assert len(times) == 120
+    assert np.all(np.diff(times) > 0)
+    assert store.window('m_speed', by='frame', start=170, stop=175)[0].tolist() == \
+        pytest.approx([f / 60 for f in range(170, 175)])
+
+
+def test_stats():
+    store = TimeSeriesStore(seconds=2)
+    feed(store, datagrams(duration=1.0))
+    stats = store.stats('m_fuelInTank', 0, 0.5)
+    assert stats['mean'].shape == (20,)
+    assert np.all(stats['min'] <= stats['mean']) and np.all(stats['mean'] <= stats['max'])
+    assert store.stats('m_fuelInTank', 10, 20) is None
+    assert store.stats('m_fuelInTank', session_uid=9) is None
+
+
+def test_late_samples_are_skipped():
+    store = TimeSeriesStore(seconds=2)
+    stream = datagrams(duration=1.0)
+    late = [data for data in stream if frame(data) == 55]
+    feed(store, stream + late)
+    assert store.sessions[1].channels['m_speed'].late == 1
+    times, _ = store.window('m_speed')
+    assert len(times) == 60 and np.all(np.diff(times) > 0)
+
+
+def test_flashback_empties_the_rings():
+    store = TimeSeriesStore(seconds=30)
+    stream = datagrams(duration=1000 / 60)
+    feed(store, stream)
+    feed(store, [data for data in stream if frame(data) >= 700])
+    assert store.sessions[1].channels['m_speed'].late == 0
+    times, _ = store.window('m_speed', by='frame')
+    assert len(times) == 300 and np.all(np.diff(times) > 0)
+
+
+def test_sessions_are_kept_apart():
+    store = TimeSeriesStore(seconds=2, max_sessions=2)
+    feed(store, datagrams(1, 1.0))
+    feed(store, datagrams(2, 0.5))
+    assert store.session_uid == 2
+    assert len(store.window('m_speed')[0]) == 30
+    assert len(store.window('m_speed', session_uid=1)[0]) == 60
+    # a third session drops the one updated least recently
+    feed(store, datagrams(3, 0.1))
+    assert sorted(store.sessions) == [2, 3]
+    assert store.window('m_speed', session_uid=1) is None
+
+
+def test_update_with_decoded_packets():
+    store = TimeSeriesStore(seconds=1)
+    for _, packet in synthetic_packets(4, 0.5):
+        store.update(packet)
+    assert len(store.window('m_throttle', session_uid=4)[0]) == 30
+    assert store.nbytes() > 0
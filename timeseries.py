@@ -0,0 +1,174 @@
+import numpy as np
+
+from numpy_structs import packet_dtype
+from packet_registry import LATE, REGISTRY, REWOUND, frame_order
+
+from f1_2019_struct import PACKET_TYPES
+
+# Per packet id: the per-car array of the packet and the channels recorded from it
+CHANNELS = {
+    0: ('cars_motion_data', ['m_worldPositionX', 'm_worldPositionY', 'm_worldPositionZ',
+                             'm_gForceLateral', 'm_gForceLongitudinal', 'm_gForceVertical']),
+    6: ('m_carTelemetryData', ['m_speed', 'm_throttle', 'm_brake', 'm_gear', 'm_engineRPM',
+                               'm_brakesTemperature', 'm_tyresSurfaceTemperature', 'm_tyresInnerTemperature',
+                               'm_engineTemperature']),
+    7: ('cars_status_data', ['m_fuelInTank', 'm_ersStoreEnergy', 'm_ersDeployedThisLap',
+                             'm_ersHarvestedThisLapMGUK', 'm_ersHarvestedThisLapMGUH', 'm_tyresWear']),
+}
+
+
+class ChannelSeries:
+    """
+    Fixed-capacity ring of per-car channels recorded from one packet type, stored column-wise
+    next to the session time and frame of every sample. Appending overwrites the oldest sample.
+
+    Windows are binary searched, so samples must stay in session time order: a sample from a few
+    frames back arrived late and is skipped, while a bigger jump back is a restart or a flashback,
+    which empties the ring; see packet_registry.frame_order.
+    """
+
+    def __init__(self, packet_type, cars_field, channels, capacity):
+        self.dtype = packet_dtype(packet_type)
+        self.cars_field = cars_field
+        self.capacity = capacity
+        self.session_time = np.zeros(capacity, dtype=np.float64)
+        self.frame = np.zeros(capacity, dtype=np.uint32)
+        cars_dtype = self.dtype[cars_field]
+        self.columns = {
+            channel: np.zeros((capacity,) + cars_dtype.shape + cars_dtype.base[channel].shape,
+                              dtype=cars_dtype.base[channel].base)
+            for channel in channels
+        }
+        self.count = 0  # Samples appended so far; the next one goes to count % capacity
+        self.late = 0  # Samples skipped because they were older than the last one
+
+    def append(self, packet):
+        """Adds a sample from a decoded packet or a datagram of the packet type."""
+        record = np.frombuffer(packet, dtype=self.dtype, count=1)[0]
+        header = record['m_header']
+        session_time, frame = header['m_sessionTime'], header['m_frameIdentifier']
+        if self.count:
+            order = frame_order(int(self.frame[(self.count - 1) % self.capacity]), frame)
+            if order is LATE:
+                self.late += 1
+                return
+            if order is REWOUND:
+                self.count = 0
+        cars = record[self.cars_field]
+        index = self.count % self.capacity
+        self.session_time[index] = session_time
+        self.frame[index] = frame
+        for channel, column in self.columns.items():
+            column[index] = cars[channel]
+        self.count += 1
+
+    def nbytes(self):
+        return self.session_time.nbytes + self.frame.nbytes + sum(column.nbytes for column in self.columns.values())
+
+    def segments(self):
+        """The stored samples as at most two index ranges of the ring, oldest first."""
+        if self.count <= self.capacity:
+            return [(0, self.count)]
+        head = self.count % self.capacity
+        return [(head, self.capacity), (0, head)] if head else [(0, self.capacity)]
+
+    def window(self, channel, start=None, stop=None, by='time'):
+        """
+        Session times and values of channel for the samples with start <= key < stop, oldest first,
+        where the key is the session time or, with by='frame', the frame identifier.
+        Keys are binary searched in the ring, so no sample outside the window is touched.
+        """
+        keys = self.session_time if by == 'time' else self.frame
+        column = self.columns[channel]
+        times, values = [], []
+        for first, last in self.segments():
+            segment = keys[first:last]
+            low = first + (np.searchsorted(segment, start, 'left') if start is not None else 0)
+            high = first + (np.searchsorted(segment, stop, 'left') if stop is not None else last - first)
+            times.append(self.session_time[low:high])
+            values.append(column[low:high])
+        return np.concatenate(times), np.concatenate(values)
+
+
+class SessionSeries:
+    """The ChannelSeries of every packet type in CHANNELS for one session."""
+
+    def __init__(self, capacity):
+        self.series = {
+            packet_id: ChannelSeries(PACKET_TYPES[packet_id], cars_field, channels, capacity)
+            for packet_id, (cars_field, channels) in CHANNELS.items()
+        }
+        self.channels = {
+            channel: series for series in self.series.values() for channel in series.columns
+        }
+
+    def nbytes(self):
+        return sum(series.nbytes() for series in self.series.values())
+
+
+class TimeSeriesStore:
+    """
+    Rolling history of the last seconds of every channel in CHANNELS for all cars, per m_sessionUID.
+    Rings are allocated once per session, up front, and at most max_sessions are kept: when another
+    one starts, the one updated least recently is dropped. Memory stays constant however long
+    sessions run. Queries default to the session updated last.
+
+    Fed with decoded packets by update(), or with raw datagrams by publish(data, spec) like the stages
+    of the live pipeline.
+    """
+
+    def __init__(self, seconds=60, rate=60, max_sessions=2):
+        self.capacity = int(seconds * rate)
+        self.max_sessions = max_sessions
+        self.sessions = {}  # Session UID -> SessionSeries, least recently updated first
+        self.session_uid = None  # Session updated last
+
+    def _session(self, session_uid):
+        session = self.sessions.pop(session_uid, None)
+        if session is None:
+            while len(self.sessions) >= self.max_sessions:
+                del self.sessions[next(iter(self.sessions))]
+            session = SessionSeries(self.capacity)
+        self.sessions[session_uid] = session
+        self.session_uid = session_uid
+        return session
+
+    def update(self, packet):
+        header = packet.m_header
+        if header.m_packetId in CHANNELS:
+            self._append(header.m_sessionUID, header.m_packetId, packet)
+
+    def publish(self, data, spec):
+        if spec.packet_id in CHANNELS:
+            self._append(REGISTRY.session(data)[0], spec.packet_id, data)
+
+    def _append(self, session_uid, packet_id, packet):
+        session = self.sessions.get(session_uid) if session_uid == self.session_uid else self._session(session_uid)
+        session.series[packet_id].append(packet)
+
+    def nbytes(self):
+        return sum(session.nbytes() for session in self.sessions.values())
+
+    def window(self, channel, start=None, stop=None, by='time', session_uid=None):
+        """
+        (session times, values[sample, car, ...]) of channel within the window, see ChannelSeries.window;
+        None if the session is unknown.
+        """
+        session = self.sessions.get(self.session_uid if session_uid is None else session_uid)
+        if session is None:
+            return None
+        return session.channels[channel].window(channel, start, stop, by)
+
+    def stats(self, channel, start=None, stop=None, by='time', session_uid=None):
+        """Per-car min, max and mean of channel within the window."""
+        window = self.window(channel, start, stop, by, session_uid)
+        if window is None:
+            return None
+        _, values = window
+        if not len(values):
+            return None
+        return {
+            'min': values.min(axis=0),
+            'max': values.max(axis=0),
+            'mean': values.mean(axis=0),
+        }